@@ -50,7 +50,11 @@ export class ApiStack extends cdk.Stack {
       },
       endpointConfiguration: {
         types: [apigateway.EndpointType.REGIONAL]
-      }
+      },
+      // Gzipped (base64-encoded) handler bodies are decoded only for callers
+      // asking for application/gzip; JSON requests, their validation and the
+      // CORS preflight mock stay text
+      binaryMediaTypes: ['application/gzip']
     });
 
     // Associate WAF with API Gateway
@@ -85,6 +89,33 @@ export class ApiStack extends cdk.Stack {
       }
     });
 
+    // JSON Schema for batch screen_entity request
+    const screenEntityBatchModel = this.api.addModel('ScreenEntityBatchModel', {
+      contentType: 'application/json',
+      modelName: 'ScreenEntityBatchRequest',
+      schema: {
+        type: apigateway.JsonSchemaType.OBJECT,
+        required: ['entities'],
+        properties: {
+          entities: {
+            type: apigateway.JsonSchemaType.ARRAY,
+            minItems: 1,
+            maxItems: 10000,
+            items: {
+              type: apigateway.JsonSchemaType.OBJECT,
+              properties: {
+                entityType: { type: apigateway.JsonSchemaType.STRING },
+                name: { type: apigateway.JsonSchemaType.STRING },
+                dateOfBirth: { type: apigateway.JsonSchemaType.STRING },
+                country: { type: apigateway.JsonSchemaType.STRING }
+              }
+            }
+          },
+          includeEvidence: { type: apigateway.JsonSchemaType.BOOLEAN }
+        }
+      }
+    });
+
     // /v1 resource
     const v1 = this.api.root.addResource('v1');
 
@@ -99,6 +130,17 @@ export class ApiStack extends cdk.Stack {
       }
     });
 
+    // POST /v1/screen_entity/batch
+    const screenEntityBatch = screenEntity.addResource('batch');
+    screenEntityBatch.addMethod('POST', new apigateway.LambdaIntegration(props.screenEntityFunction), {
+      authorizer,
+      authorizationType: apigateway.AuthorizationType.COGNITO,
+      requestValidator,
+      requestModels: {
+        'application/json': screenEntityBatchModel
+      }
+    });
+
     // GET /v1/entities/{id}/risk
     const entities = v1.addResource('entities');
     const entityId = entities.addResource('{id}');
@@ -107,7 +149,12 @@ export class ApiStack extends cdk.Stack {
       authorizer,
       authorizationType: apigateway.AuthorizationType.COGNITO,
       requestParameters: {
-        'method.request.path.id': true
+        'method.request.path.id': true,
+        'method.request.querystring.limit': false,
+        'method.request.querystring.cursor': false,
+        'method.request.querystring.from': false,
+        'method.request.querystring.to': false,
+        'method.request.querystring.fields': false
       }
     });
 
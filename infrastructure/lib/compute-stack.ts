@@ -44,31 +44,95 @@ export class ComputeStack extends cdk.Stack {
     props.riskTable.grantReadData(apiLambdaRole);
     props.kmsKey.grantDecrypt(apiLambdaRole);
 
+    // Lambda layer: JSON request/response helpers shared by the API handlers
+    const apiCommonLayer = new lambda.LayerVersion(this, 'ApiCommonLayer', {
+      layerVersionName: `aegis-api-common-${props.environment}`,
+      code: lambda.Code.fromAsset('../services/api/common', {
+        // Installs orjson (the fast JSON encoder) next to the helpers
+        bundling: {
+          image: lambda.Runtime.PYTHON_3_11.bundlingImage,
+          command: [
+            'bash', '-c',
+            'pip install -r requirements.txt -t /asset-output/python && cp -r python/. /asset-output/python'
+          ]
+        }
+      }),
+      compatibleRuntimes: [lambda.Runtime.PYTHON_3_11],
+      description: 'Shared JSON serialization and gzip responses for API handlers'
+    });
+
     // Lambda: Screen Entity
     this.screenEntityFunction = new lambda.Function(this, 'ScreenEntityFunction', {
       functionName: `aegis-screen-entity-${props.environment}`,
       runtime: lambda.Runtime.PYTHON_3_11,
       handler: 'index.handler',
       code: lambda.Code.fromAsset('../services/api/screen-entity'),
+      layers: [apiCommonLayer],
       role: apiLambdaRole,
       vpc: props.vpc,
       vpcSubnets: { subnetType: ec2.SubnetType.PRIVATE_WITH_EGRESS },
       securityGroups: [props.securityGroup],
       timeout: cdk.Duration.seconds(30),
-      memorySize: 512,
+      memorySize: 1024,
       environment: {
         RISK_TABLE_NAME: props.riskTable.tableName,
-        ENVIRONMENT: props.environment
+        ENVIRONMENT: props.environment,
+        MAX_BATCH_SIZE: '10000',
+        READ_CONCURRENCY: '16',
+        PROFILE_CACHE_SIZE: '10000',
+        PROFILE_CACHE_TTL_SECONDS: '5',
+        NAME_INDEX_BUCKET: props.processedBucket.bucketName,
+        INDEX_TTL_SECONDS: '300'
       },
       logRetention: logs.RetentionDays.ONE_MONTH
     });
 
+    // Screening containers load the name index from a snapshot in S3
+    props.processedBucket.grantRead(apiLambdaRole, 'indexes/*');
+
+    // Lambda: Name index snapshot, so containers don't each scan the table
+    const nameIndexSnapshotRole = new iam.Role(this, 'NameIndexSnapshotRole', {
+      assumedBy: new iam.ServicePrincipal('lambda.amazonaws.com'),
+      managedPolicies: [
+        iam.ManagedPolicy.fromAwsManagedPolicyName('service-role/AWSLambdaVPCAccessExecutionRole')
+      ]
+    });
+
+    props.riskTable.grantReadData(nameIndexSnapshotRole);
+    props.processedBucket.grantPut(nameIndexSnapshotRole, 'indexes/*');
+    props.kmsKey.grantEncryptDecrypt(nameIndexSnapshotRole);
+
+    const nameIndexSnapshotFunction = new lambda.Function(this, 'NameIndexSnapshotFunction', {
+      functionName: `aegis-name-index-snapshot-${props.environment}`,
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: 'name_snapshot.handler',
+      code: lambda.Code.fromAsset('../services/api/screen-entity'),
+      role: nameIndexSnapshotRole,
+      vpc: props.vpc,
+      vpcSubnets: { subnetType: ec2.SubnetType.PRIVATE_WITH_EGRESS },
+      securityGroups: [props.securityGroup],
+      timeout: cdk.Duration.minutes(5),
+      memorySize: 2048,
+      reservedConcurrentExecutions: 1,
+      environment: {
+        RISK_TABLE_NAME: props.riskTable.tableName,
+        NAME_INDEX_BUCKET: props.processedBucket.bucketName
+      },
+      logRetention: logs.RetentionDays.ONE_WEEK
+    });
+
+    new events.Rule(this, 'NameIndexSnapshotSchedule', {
+      schedule: events.Schedule.rate(cdk.Duration.minutes(5)),
+      targets: [new targets.LambdaFunction(nameIndexSnapshotFunction)]
+    });
+
     // Lambda: Get Risk History
     this.getRiskHistoryFunction = new lambda.Function(this, 'GetRiskHistoryFunction', {
       functionName: `aegis-get-risk-history-${props.environment}`,
       runtime: lambda.Runtime.PYTHON_3_11,
       handler: 'index.handler',
       code: lambda.Code.fromAsset('../services/api/get-risk-history'),
+      layers: [apiCommonLayer],
       role: apiLambdaRole,
       vpc: props.vpc,
       vpcSubnets: { subnetType: ec2.SubnetType.PRIVATE_WITH_EGRESS },
@@ -92,11 +156,19 @@ export class ComputeStack extends cdk.Stack {
     props.riskTable.grantReadWriteData(adminLambdaRole);
     props.kmsKey.grant(adminLambdaRole, 'kms:Decrypt', 'kms:Encrypt');
 
+    // Threshold changes are announced to start the re-tiering job
+    adminLambdaRole.addToPolicy(new iam.PolicyStatement({
+      effect: iam.Effect.ALLOW,
+      actions: ['events:PutEvents'],
+      resources: [`arn:aws:events:${this.region}:${this.account}:event-bus/default`]
+    }));
+
     this.adminThresholdsFunction = new lambda.Function(this, 'AdminThresholdsFunction', {
       functionName: `aegis-admin-thresholds-${props.environment}`,
       runtime: lambda.Runtime.PYTHON_3_11,
       handler: 'index.handler',
       code: lambda.Code.fromAsset('../services/api/admin-thresholds'),
+      layers: [apiCommonLayer],
       role: adminLambdaRole,
       vpc: props.vpc,
       vpcSubnets: { subnetType: ec2.SubnetType.PRIVATE_WITH_EGRESS },
@@ -132,7 +204,9 @@ export class ComputeStack extends cdk.Stack {
       timeout: cdk.Duration.minutes(5),
       memorySize: 1024,
       environment: {
-        RAW_BUCKET: props.rawBucket.bucketName
+        RAW_BUCKET: props.rawBucket.bucketName,
+        // Set to 'fields' to redact JSON/NDJSON records field by field
+        REDACTION_MODE: 'text'
       },
       logRetention: logs.RetentionDays.THREE_MONTHS
     });
@@ -153,7 +227,9 @@ export class ComputeStack extends cdk.Stack {
     });
 
     props.rawBucket.grantPut(scraperFunction);
-    props.kmsKey.grantEncrypt(scraperFunction);
+    // Reads its stored ETag/Last-Modified validators for conditional requests
+    props.rawBucket.grantRead(scraperFunction, 'state/http-cache/*');
+    props.kmsKey.grantEncryptDecrypt(scraperFunction);
 
     // Schedule scraper to run daily
     new events.Rule(this, 'DailyScraperSchedule', {
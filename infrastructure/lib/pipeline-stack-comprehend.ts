@@ -2,6 +2,7 @@ import * as cdk from 'aws-cdk-lib';
 import * as stepfunctions from 'aws-cdk-lib/aws-stepfunctions';
 import * as tasks from 'aws-cdk-lib/aws-stepfunctions-tasks';
 import * as lambda from 'aws-cdk-lib/aws-lambda';
+import * as lambdaEventSources from 'aws-cdk-lib/aws-lambda-event-sources';
 import * as iam from 'aws-cdk-lib/aws-iam';
 import * as s3 from 'aws-cdk-lib/aws-s3';
 import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
@@ -10,6 +11,7 @@ import * as kms from 'aws-cdk-lib/aws-kms';
 import * as events from 'aws-cdk-lib/aws-events';
 import * as targets from 'aws-cdk-lib/aws-events-targets';
 import * as logs from 'aws-cdk-lib/aws-logs';
+import * as sqs from 'aws-cdk-lib/aws-sqs';
 import { Construct } from 'constructs';
 
 interface PipelineStackProps extends cdk.StackProps {
@@ -52,6 +54,7 @@ export class PipelineStackComprehend extends cdk.Stack {
       effect: iam.Effect.ALLOW,
       actions: [
         'comprehend:DetectEntities',
+        'comprehend:BatchDetectEntities',
         'comprehend:DetectSentiment',
         'comprehend:DetectKeyPhrases'
       ],
@@ -81,17 +84,19 @@ export class PipelineStackComprehend extends cdk.Stack {
       functionName: `aegis-risk-scoring-${props.environment}`,
       runtime: lambda.Runtime.PYTHON_3_11,
       handler: 'index.handler',
-      code: lambda.Code.fromAsset('../services/nlp/risk-scoring'),
+      code: lambda.Code.fromAsset('../services/nlp/risk-scoring', { exclude: ['tests'] }),
       timeout: cdk.Duration.minutes(5),
       memorySize: 1024,
       environment: {
-        RISK_TABLE_NAME: props.riskTable.tableName
+        RISK_TABLE_NAME: props.riskTable.tableName,
+        // Admin threshold changes apply to new scores within this many seconds
+        THRESHOLDS_TTL_SECONDS: '5'
       },
       logRetention: logs.RetentionDays.ONE_MONTH
     });
 
     props.processedBucket.grantRead(riskScoringFunction);
-    props.riskTable.grantWriteData(riskScoringFunction);
+    props.riskTable.grantReadWriteData(riskScoringFunction);
     props.kmsKey.grant(riskScoringFunction, 'kms:Decrypt', 'kms:Encrypt', 'kms:GenerateDataKey');
 
     // EventBridge permissions
@@ -101,6 +106,50 @@ export class PipelineStackComprehend extends cdk.Stack {
       resources: ['*']
     }));
 
+    // Lambda: Re-tiering (re-applies changed thresholds to stored profiles)
+    const retierFunctionName = `aegis-retier-${props.environment}`;
+    const retierFunction = new lambda.Function(this, 'RetierFunction', {
+      functionName: retierFunctionName,
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: 'retier.handler',
+      code: lambda.Code.fromAsset('../services/nlp/risk-scoring', { exclude: ['tests'] }),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 2048,
+      // One run at a time; a queued run reloads the latest thresholds
+      reservedConcurrentExecutions: 1,
+      environment: {
+        RISK_TABLE_NAME: props.riskTable.tableName,
+        RETIER_SEGMENTS: '16'
+      },
+      logRetention: logs.RetentionDays.ONE_MONTH
+    });
+
+    props.riskTable.grantReadWriteData(retierFunction);
+    props.kmsKey.grant(retierFunction, 'kms:Decrypt', 'kms:Encrypt', 'kms:GenerateDataKey');
+
+    retierFunction.addToRolePolicy(new iam.PolicyStatement({
+      effect: iam.Effect.ALLOW,
+      actions: ['events:PutEvents'],
+      resources: ['*']
+    }));
+
+    // Long runs continue in a new invocation of the same function
+    retierFunction.addToRolePolicy(new iam.PolicyStatement({
+      effect: iam.Effect.ALLOW,
+      actions: ['lambda:InvokeFunction'],
+      resources: [`arn:aws:lambda:${this.region}:${this.account}:function:${retierFunctionName}`]
+    }));
+
+    new events.Rule(this, 'ThresholdsUpdatedRule', {
+      ruleName: `aegis-thresholds-updated-${props.environment}`,
+      description: 'Re-tier stored profiles when risk thresholds change',
+      eventPattern: {
+        source: ['aegis.admin'],
+        detailType: ['Thresholds Updated']
+      },
+      targets: [new targets.LambdaFunction(retierFunction, { retryAttempts: 2 })]
+    });
+
     // Step Functions State Machine
     const nerTask = new tasks.LambdaInvoke(this, 'NER Task', {
       lambdaFunction: nerFunction,
@@ -147,6 +196,10 @@ export class PipelineStackComprehend extends cdk.Stack {
         detail: {
           bucket: {
             name: [props.rawBucket.bucketName]
+          },
+          // Raw data only; manifests/ describe objects and must not start a run
+          object: {
+            key: [{ prefix: 'raw/' }]
           }
         }
       }
@@ -156,20 +209,61 @@ export class PipelineStackComprehend extends cdk.Stack {
       input: events.RuleTargetInput.fromEventPath('$.detail')
     }));
 
+    // SQS: durable webhook queue; failed deliveries are redelivered with
+    // backoff and land in the dead-letter queue after maxReceiveCount attempts
+    const webhookDeadLetterQueue = new sqs.Queue(this, 'WebhookDeadLetterQueue', {
+      queueName: `aegis-webhook-dlq-${props.environment}`,
+      retentionPeriod: cdk.Duration.days(14),
+      encryption: sqs.QueueEncryption.SQS_MANAGED
+    });
+
+    const webhookQueue = new sqs.Queue(this, 'WebhookQueue', {
+      queueName: `aegis-webhook-${props.environment}`,
+      visibilityTimeout: cdk.Duration.minutes(12),
+      retentionPeriod: cdk.Duration.days(4),
+      encryption: sqs.QueueEncryption.SQS_MANAGED,
+      deadLetterQueue: {
+        queue: webhookDeadLetterQueue,
+        maxReceiveCount: 10
+      }
+    });
+
     // Lambda: Webhook Sender
     const webhookFunction = new lambda.Function(this, 'WebhookFunction', {
       functionName: `aegis-webhook-${props.environment}`,
       runtime: lambda.Runtime.PYTHON_3_11,
       handler: 'index.handler',
       code: lambda.Code.fromAsset('../services/webhooks'),
-      timeout: cdk.Duration.seconds(30),
+      timeout: cdk.Duration.minutes(2),
       memorySize: 256,
       environment: {
-        ENVIRONMENT: props.environment
+        ENVIRONMENT: props.environment,
+        WEBHOOK_QUEUE_URL: webhookQueue.queueUrl,
+        DEAD_LETTER_QUEUE_URL: webhookDeadLetterQueue.queueUrl,
+        RISK_TABLE_NAME: props.riskTable.tableName,
+        DELIVERY_CONCURRENCY: '16'
       },
       logRetention: logs.RetentionDays.ONE_MONTH
     });
 
+    webhookFunction.addToRolePolicy(new iam.PolicyStatement({
+      effect: iam.Effect.ALLOW,
+      actions: ['secretsmanager:GetSecretValue'],
+      resources: [`arn:aws:secretsmanager:${this.region}:${this.account}:secret:aegis/webhooks/*`]
+    }));
+
+    // Subscriptions are read from the CONFIG:webhook:subscriptions item
+    props.riskTable.grantReadData(webhookFunction);
+    webhookQueue.grantSendMessages(webhookFunction);
+    webhookDeadLetterQueue.grantSendMessages(webhookFunction);
+
+    // Batches of up to 100 events per invocation; only failed messages are retried
+    webhookFunction.addEventSource(new lambdaEventSources.SqsEventSource(webhookQueue, {
+      batchSize: 100,
+      maxBatchingWindow: cdk.Duration.seconds(5),
+      reportBatchItemFailures: true
+    }));
+
     // EventBridge Rule: Risk Updates → Webhook
     const riskUpdateRule = new events.Rule(this, 'RiskUpdateRule', {
       ruleName: `aegis-risk-update-${props.environment}`,
@@ -180,7 +274,7 @@ export class PipelineStackComprehend extends cdk.Stack {
       }
     });
 
-    riskUpdateRule.addTarget(new targets.LambdaFunction(webhookFunction));
+    riskUpdateRule.addTarget(new targets.SqsQueue(webhookQueue));
 
     new cdk.CfnOutput(this, 'NlpStateMachineArn', { 
       value: this.nlpStateMachine.stateMachineArn 
@@ -2,6 +2,7 @@ import * as cdk from 'aws-cdk-lib';
 import * as stepfunctions from 'aws-cdk-lib/aws-stepfunctions';
 import * as tasks from 'aws-cdk-lib/aws-stepfunctions-tasks';
 import * as lambda from 'aws-cdk-lib/aws-lambda';
+import * as lambdaEventSources from 'aws-cdk-lib/aws-lambda-event-sources';
 import * as sagemaker from 'aws-cdk-lib/aws-sagemaker';
 import * as iam from 'aws-cdk-lib/aws-iam';
 import * as s3 from 'aws-cdk-lib/aws-s3';
@@ -11,6 +12,7 @@ import * as kms from 'aws-cdk-lib/aws-kms';
 import * as events from 'aws-cdk-lib/aws-events';
 import * as targets from 'aws-cdk-lib/aws-events-targets';
 import * as logs from 'aws-cdk-lib/aws-logs';
+import * as sqs from 'aws-cdk-lib/aws-sqs';
 import { Construct } from 'constructs';
 
 interface PipelineStackProps extends cdk.StackProps {
@@ -141,7 +143,7 @@ export class PipelineStack extends cdk.Stack {
       functionName: `aegis-risk-scoring-${props.environment}`,
       runtime: lambda.Runtime.PYTHON_3_11,
       handler: 'index.handler',
-      code: lambda.Code.fromAsset('../services/nlp/risk-scoring'),
+      code: lambda.Code.fromAsset('../services/nlp/risk-scoring', { exclude: ['tests'] }),
       vpc: props.vpc,
       vpcSubnets: { subnetType: ec2.SubnetType.PRIVATE_WITH_EGRESS },
       securityGroups: [props.securityGroup],
@@ -149,13 +151,15 @@ export class PipelineStack extends cdk.Stack {
       memorySize: 1024,
       environment: {
         SAGEMAKER_ENDPOINT: this.sagemakerEndpoint.endpointName!,
-        RISK_TABLE_NAME: props.riskTable.tableName
+        RISK_TABLE_NAME: props.riskTable.tableName,
+        // Admin threshold changes apply to new scores within this many seconds
+        THRESHOLDS_TTL_SECONDS: '5'
       },
       logRetention: logs.RetentionDays.ONE_MONTH
     });
 
     props.processedBucket.grantRead(riskScoringFunction);
-    props.riskTable.grantWriteData(riskScoringFunction);
+    props.riskTable.grantReadWriteData(riskScoringFunction);
     props.kmsKey.grant(riskScoringFunction, 'kms:Decrypt', 'kms:Encrypt', 'kms:GenerateDataKey');
 
     riskScoringFunction.addToRolePolicy(new iam.PolicyStatement({
@@ -164,6 +168,53 @@ export class PipelineStack extends cdk.Stack {
       resources: [this.sagemakerEndpoint.ref]
     }));
 
+    // Lambda: Re-tiering (re-applies changed thresholds to stored profiles)
+    const retierFunctionName = `aegis-retier-${props.environment}`;
+    const retierFunction = new lambda.Function(this, 'RetierFunction', {
+      functionName: retierFunctionName,
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: 'retier.handler',
+      code: lambda.Code.fromAsset('../services/nlp/risk-scoring', { exclude: ['tests'] }),
+      vpc: props.vpc,
+      vpcSubnets: { subnetType: ec2.SubnetType.PRIVATE_WITH_EGRESS },
+      securityGroups: [props.securityGroup],
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 2048,
+      // One run at a time; a queued run reloads the latest thresholds
+      reservedConcurrentExecutions: 1,
+      environment: {
+        RISK_TABLE_NAME: props.riskTable.tableName,
+        RETIER_SEGMENTS: '16'
+      },
+      logRetention: logs.RetentionDays.ONE_MONTH
+    });
+
+    props.riskTable.grantReadWriteData(retierFunction);
+    props.kmsKey.grant(retierFunction, 'kms:Decrypt', 'kms:Encrypt', 'kms:GenerateDataKey');
+
+    retierFunction.addToRolePolicy(new iam.PolicyStatement({
+      effect: iam.Effect.ALLOW,
+      actions: ['events:PutEvents'],
+      resources: ['*']
+    }));
+
+    // Long runs continue in a new invocation of the same function
+    retierFunction.addToRolePolicy(new iam.PolicyStatement({
+      effect: iam.Effect.ALLOW,
+      actions: ['lambda:InvokeFunction'],
+      resources: [`arn:aws:lambda:${this.region}:${this.account}:function:${retierFunctionName}`]
+    }));
+
+    new events.Rule(this, 'ThresholdsUpdatedRule', {
+      ruleName: `aegis-thresholds-updated-${props.environment}`,
+      description: 'Re-tier stored profiles when risk thresholds change',
+      eventPattern: {
+        source: ['aegis.admin'],
+        detailType: ['Thresholds Updated']
+      },
+      targets: [new targets.LambdaFunction(retierFunction, { retryAttempts: 2 })]
+    });
+
     // Step Functions State Machine: NLP Pipeline
     const nerTask = new tasks.LambdaInvoke(this, 'NER Task', {
       lambdaFunction: nerFunction,
@@ -215,6 +266,10 @@ export class PipelineStack extends cdk.Stack {
         detail: {
           bucket: {
             name: [props.rawBucket.bucketName]
+          },
+          // Raw data only; manifests/ describe objects and must not start a run
+          object: {
+            key: [{ prefix: 'raw/' }]
           }
         }
       }
@@ -234,6 +289,25 @@ export class PipelineStack extends cdk.Stack {
       }
     });
 
+    // SQS: durable webhook queue; failed deliveries are redelivered with
+    // backoff and land in the dead-letter queue after maxReceiveCount attempts
+    const webhookDeadLetterQueue = new sqs.Queue(this, 'WebhookDeadLetterQueue', {
+      queueName: `aegis-webhook-dlq-${props.environment}`,
+      retentionPeriod: cdk.Duration.days(14),
+      encryption: sqs.QueueEncryption.SQS_MANAGED
+    });
+
+    const webhookQueue = new sqs.Queue(this, 'WebhookQueue', {
+      queueName: `aegis-webhook-${props.environment}`,
+      visibilityTimeout: cdk.Duration.minutes(12),
+      retentionPeriod: cdk.Duration.days(4),
+      encryption: sqs.QueueEncryption.SQS_MANAGED,
+      deadLetterQueue: {
+        queue: webhookDeadLetterQueue,
+        maxReceiveCount: 10
+      }
+    });
+
     // Lambda: Webhook Sender
     const webhookFunction = new lambda.Function(this, 'WebhookFunction', {
       functionName: `aegis-webhook-${props.environment}`,
@@ -243,15 +317,37 @@ export class PipelineStack extends cdk.Stack {
       vpc: props.vpc,
       vpcSubnets: { subnetType: ec2.SubnetType.PRIVATE_WITH_EGRESS },
       securityGroups: [props.securityGroup],
-      timeout: cdk.Duration.seconds(30),
+      timeout: cdk.Duration.minutes(2),
       memorySize: 256,
       environment: {
-        ENVIRONMENT: props.environment
+        ENVIRONMENT: props.environment,
+        WEBHOOK_QUEUE_URL: webhookQueue.queueUrl,
+        DEAD_LETTER_QUEUE_URL: webhookDeadLetterQueue.queueUrl,
+        RISK_TABLE_NAME: props.riskTable.tableName,
+        DELIVERY_CONCURRENCY: '16'
       },
       logRetention: logs.RetentionDays.ONE_MONTH
     });
 
-    riskUpdateRule.addTarget(new targets.LambdaFunction(webhookFunction));
+    webhookFunction.addToRolePolicy(new iam.PolicyStatement({
+      effect: iam.Effect.ALLOW,
+      actions: ['secretsmanager:GetSecretValue'],
+      resources: [`arn:aws:secretsmanager:${this.region}:${this.account}:secret:aegis/webhooks/*`]
+    }));
+
+    // Subscriptions are read from the CONFIG:webhook:subscriptions item
+    props.riskTable.grantReadData(webhookFunction);
+    webhookQueue.grantSendMessages(webhookFunction);
+    webhookDeadLetterQueue.grantSendMessages(webhookFunction);
+
+    // Batches of up to 100 events per invocation; only failed messages are retried
+    webhookFunction.addEventSource(new lambdaEventSources.SqsEventSource(webhookQueue, {
+      batchSize: 100,
+      maxBatchingWindow: cdk.Duration.seconds(5),
+      reportBatchItemFailures: true
+    }));
+
+    riskUpdateRule.addTarget(new targets.SqsQueue(webhookQueue));
 
     new cdk.CfnOutput(this, 'NlpStateMachineArn', { 
       value: this.nlpStateMachine.stateMachineArn 
@@ -5,10 +5,14 @@ Shows risk probabilities without manual upload
 """
 
 import json
+import os
+import sys
 import boto3
-from decimal import Decimal
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services', 'nlp', 'risk-scoring'))
+from bulk_writer import BulkWriter
+
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table('aegis-risk-profiles-dev')
 
@@ -18,17 +22,6 @@ def load_test_data():
         data = json.load(f)
     return data['riskProfiles']
 
-def convert_floats_to_decimal(obj):
-    """Convert floats to Decimal for DynamoDB"""
-    if isinstance(obj, list):
-        return [convert_floats_to_decimal(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {k: convert_floats_to_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, float):
-        return Decimal(str(obj))
-    else:
-        return obj
-
 def populate_dynamodb():
     """Populate DynamoDB with test risk profiles"""
     print("=" * 60)
@@ -37,6 +30,7 @@ def populate_dynamodb():
     print()
     
     risk_profiles = load_test_data()
+    writer = BulkWriter(table)
     
     for profile in risk_profiles:
         entity_id = profile['entityId']
@@ -50,25 +44,25 @@ def populate_dynamodb():
             'entityId': entity_id,
             'asOfTs': int(datetime.utcnow().timestamp()),
             'name': entity_name,
-            'score': Decimal(str(risk_score)),
+            'score': risk_score,
             'status': status,
             'riskLevel': risk_level,
-            'confidence': Decimal(str(profile['confidence'])),
-            'riskBreakdown': convert_floats_to_decimal(profile['riskBreakdown']),
-            'evidence': convert_floats_to_decimal(profile['evidence']),
+            'confidence': profile['confidence'],
+            'riskBreakdown': profile['riskBreakdown'],
+            'evidence': profile['evidence'],
             'recommendations': profile['recommendations'],
             'processedAt': datetime.utcnow().isoformat(),
-            'metadata': convert_floats_to_decimal(profile.get('metadata', {}))
+            'metadata': profile.get('metadata', {})
         }
         
         # Add optional fields
         if 'caveats' in profile:
             item['caveats'] = profile['caveats']
         if 'pepDetails' in profile:
-            item['pepDetails'] = convert_floats_to_decimal(profile['pepDetails'])
+            item['pepDetails'] = profile['pepDetails']
         
-        # Write to DynamoDB
-        table.put_item(Item=item)
+        # Queue for DynamoDB (floats converted to Decimal by the writer)
+        writer.put(item)
         
         # Print summary
         color = '\033[91m' if risk_score >= 0.7 else '\033[93m' if risk_score >= 0.3 else '\033[92m'
@@ -82,6 +76,9 @@ def populate_dynamodb():
         print(f"  Evidence: {len(profile['evidence'])} items")
         print()
     
+    # Write remaining buffered items
+    writer.flush()
+    
     print("=" * 60)
     print(f"  ✓ Successfully inserted {len(risk_profiles)} risk profiles")
     print("=" * 60)
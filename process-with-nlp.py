@@ -5,15 +5,30 @@ Generates risk probabilities from actual text analysis
 """
 
 import json
+import os
+import sys
 import boto3
 from decimal import Decimal
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services', 'nlp', 'risk-scoring'))
+from thresholds import ThresholdProvider
+
 # AWS clients
 comprehend = boto3.client('comprehend')
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table('aegis-risk-profiles-dev')
 
+# Same admin-configured cutoffs as the risk-scoring Lambda
+threshold_provider = ThresholdProvider(table)
+
+RECOMMENDATIONS = {
+    'CRITICAL': 'REJECT - Do not onboard',
+    'HIGH': 'Enhanced Due Diligence required',
+    'MEDIUM': 'Standard Due Diligence required',
+    'LOW': 'Proceed with standard onboarding'
+}
+
 # Sample entities to analyze
 ENTITIES_TO_ANALYZE = [
     {
@@ -197,22 +212,9 @@ def process_entity(entity_data):
     # Step 3: Determine status and level
     risk_score = risk_analysis['overallRisk']
     
-    if risk_score >= 0.7:
-        status = 'REVIEW_REQUIRED'
-        risk_level = 'CRITICAL'
-        recommendation = 'REJECT - Do not onboard'
-    elif risk_score >= 0.5:
-        status = 'REVIEW_REQUIRED'
-        risk_level = 'HIGH'
-        recommendation = 'Enhanced Due Diligence required'
-    elif risk_score >= 0.3:
-        status = 'REVIEW_REQUIRED'
-        risk_level = 'MEDIUM'
-        recommendation = 'Standard Due Diligence required'
-    else:
-        status = 'CLEAR'
-        risk_level = 'LOW'
-        recommendation = 'Proceed with standard onboarding'
+    thresholds = threshold_provider.get()
+    status, risk_level = thresholds.classify(risk_score)
+    recommendation = RECOMMENDATIONS[risk_level]
     
     # Step 4: Create entity ID
     entity_id = f"{entity_type.lower()}:{name.lower().replace(' ', '_')}"
@@ -225,6 +227,7 @@ def process_entity(entity_data):
         'score': Decimal(str(round(risk_score, 4))),
         'status': status,
         'riskLevel': risk_level,
+        'thresholdsVersion': thresholds.version,
         'confidence': Decimal(str(0.85)),  # NLP confidence
         'riskBreakdown': {k: Decimal(str(round(v, 4))) for k, v in risk_analysis['riskBreakdown'].items()},
         'evidence': risk_analysis['evidence'],
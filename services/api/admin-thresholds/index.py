@@ -1,10 +1,111 @@
 import json
 import os
 import boto3
+from botocore.exceptions import ClientError
 from datetime import datetime
+from decimal import Decimal
+
+from api_response import json_response, parse_body
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(os.environ['RISK_TABLE_NAME'])
+events = boto3.client('events')
+
+# Current values of every threshold, read by the scorers in one query
+THRESHOLDS_CONFIG_ID = 'CONFIG:thresholds'
+
+# REVIEW_REQUIRED sets the status cutoff, the rest the riskLevel tiers;
+# defaults match DEFAULT_THRESHOLDS in risk-scoring's thresholds.py
+TIER_DEFAULTS = {
+    'REVIEW_REQUIRED': Decimal('0.3'),
+    'MEDIUM': Decimal('0.3'),
+    'HIGH': Decimal('0.5'),
+    'CRITICAL': Decimal('0.7')
+}
+
+# Concurrent updates of the tiers are retried this often before giving up
+MAX_UPDATE_ATTEMPTS = 3
+
+class ConflictError(Exception):
+    pass
+
+def parse_threshold(body):
+    """
+    (thresholdType, value) from a request body, or None if invalid
+    
+    Tier thresholds must lie between 0 and 1; other types are only kept in
+    their history item, as before tiers were configurable.
+    """
+    threshold_type = body.get('thresholdType')
+    value = body.get('value')
+    if not isinstance(threshold_type, str) or not threshold_type:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if threshold_type in TIER_DEFAULTS and not 0 <= value <= 1:
+        return None
+    return threshold_type, Decimal(str(value))
+
+def ordering_error(values):
+    """
+    Why a set of tier thresholds is inconsistent, or None
+    """
+    if not values['CRITICAL'] >= values['HIGH'] >= values['MEDIUM']:
+        return 'thresholds must satisfy CRITICAL >= HIGH >= MEDIUM'
+    if values['REVIEW_REQUIRED'] > values['CRITICAL']:
+        return 'REVIEW_REQUIRED must not exceed CRITICAL'
+    return None
+
+def update_tier(threshold_type, threshold_value, admin_user, timestamp):
+    """
+    Set one tier threshold in CONFIG:thresholds, keeping the tiers ordered
+    
+    The current item is read consistently and the write is conditional on
+    its version, so two concurrent updates can't combine into an invalid
+    set. Returns (new version, None) or (None, ordering error); raises
+    ConflictError if the item keeps changing underneath.
+    """
+    for attempt in range(MAX_UPDATE_ATTEMPTS):
+        current = table.get_item(
+            Key={'entityId': THRESHOLDS_CONFIG_ID, 'asOfTs': 0},
+            ConsistentRead=True
+        ).get('Item', {})
+        
+        values = {name: current.get(name, default) for name, default in TIER_DEFAULTS.items()}
+        values[threshold_type] = threshold_value
+        error = ordering_error(values)
+        if error:
+            return None, error
+        
+        if 'version' in current:
+            condition = 'version = :expected'
+            expected = {':expected': current['version']}
+        else:
+            condition = 'attribute_not_exists(version)'
+            expected = {}
+        
+        try:
+            response = table.update_item(
+                Key={'entityId': THRESHOLDS_CONFIG_ID, 'asOfTs': 0},
+                UpdateExpression='SET #t = :value, updatedBy = :user, #ts = :ts ADD version :one',
+                ConditionExpression=condition,
+                ExpressionAttributeNames={'#t': threshold_type, '#ts': 'timestamp'},
+                ExpressionAttributeValues={
+                    ':value': threshold_value,
+                    ':user': admin_user,
+                    ':ts': timestamp,
+                    ':one': 1,
+                    **expected
+                },
+                ReturnValues='UPDATED_NEW'
+            )
+            return int(response['Attributes']['version']), None
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            print(f"Thresholds changed concurrently, retrying ({attempt + 1}/{MAX_UPDATE_ATTEMPTS})")
+    
+    raise ConflictError()
 
 def handler(event, context):
     """
@@ -16,9 +117,29 @@ def handler(event, context):
         claims = event['requestContext']['authorizer']['claims']
         admin_user = claims.get('email', 'unknown')
         
-        body = json.loads(event['body'])
-        threshold_type = body['thresholdType']
-        threshold_value = body['value']
+        parsed = parse_threshold(parse_body(event))
+        if parsed is None:
+            return json_response(400, {
+                'error': 'Invalid request',
+                'message': 'thresholdType must be a string and value a number; '
+                           f"{', '.join(TIER_DEFAULTS)} must be between 0 and 1"
+            }, event)
+        threshold_type, threshold_value = parsed
+        timestamp = datetime.utcnow().isoformat()
+        
+        # Tier thresholds also go into the current set the scorers read; the
+        # version tells them it changed
+        version = None
+        if threshold_type in TIER_DEFAULTS:
+            try:
+                version, error = update_tier(threshold_type, threshold_value, admin_user, timestamp)
+            except ConflictError:
+                return json_response(409, {
+                    'error': 'Conflict',
+                    'message': 'Thresholds are being updated concurrently, please retry'
+                }, event)
+            if error:
+                return json_response(400, {'error': 'Invalid request', 'message': error}, event)
         
         # Store threshold configuration
         config_id = f"CONFIG:threshold:{threshold_type}"
@@ -29,36 +150,45 @@ def handler(event, context):
                 'asOfTs': int(datetime.utcnow().timestamp()),
                 'value': threshold_value,
                 'updatedBy': admin_user,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': timestamp
             }
         )
         
+        if version is not None:
+            # Starts the re-tiering job for profiles already stored; the new
+            # threshold is saved either way, so a failure here is only logged
+            try:
+                events.put_events(Entries=[{
+                    'Source': 'aegis.admin',
+                    'DetailType': 'Thresholds Updated',
+                    'Detail': json.dumps({
+                        'thresholdType': threshold_type,
+                        'value': float(threshold_value),
+                        'version': version
+                    })
+                }])
+            except Exception as e:
+                print(f"Error announcing threshold update: {str(e)}")
+        
         # Log audit event
         print(json.dumps({
             'event': 'THRESHOLD_UPDATE',
             'admin': admin_user,
             'thresholdType': threshold_type,
-            'value': threshold_value,
-            'timestamp': datetime.utcnow().isoformat()
+            'value': float(threshold_value),
+            'version': version,
+            'timestamp': timestamp
         }))
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Strict-Transport-Security': 'max-age=31536000; includeSubDomains'
-            },
-            'body': json.dumps({
-                'message': 'Threshold updated successfully',
-                'thresholdType': threshold_type,
-                'value': threshold_value
-            })
+        result = {
+            'message': 'Threshold updated successfully',
+            'thresholdType': threshold_type,
+            'value': threshold_value
         }
+        if version is not None:
+            result['version'] = version
+        return json_response(200, result, event)
         
     except Exception as e:
         print(f"Error updating threshold: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'error': 'Internal server error'})
-        }
+        return json_response(500, {'error': 'Internal server error'}, event)
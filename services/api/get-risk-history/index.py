@@ -1,52 +1,150 @@
+import base64
 import json
 import os
+import re
 import boto3
+from datetime import datetime, timezone
 from decimal import Decimal
 
+from api_response import json_response
+
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(os.environ['RISK_TABLE_NAME'])
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_FIELDS = 20
+
+FIELD_NAME = re.compile(r'^[A-Za-z][A-Za-z0-9_]*$')
+
+class BadRequest(Exception):
+    """
+    Invalid query parameters; reported to the caller as a 400
+    """
+
+def encode_cursor(entity_id, last_key):
+    """
+    Opaque continuation token for a query's LastEvaluatedKey
+    """
+    token = json.dumps({'e': entity_id, 't': str(last_key['asOfTs'])}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+def decode_cursor(entity_id, cursor):
+    """
+    ExclusiveStartKey for a cursor issued for the same entity
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        token = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        as_of_ts = Decimal(token['t'])
+    except Exception:
+        raise BadRequest('cursor is invalid')
+    
+    if token.get('e') != entity_id:
+        raise BadRequest('cursor belongs to a different entity')
+    return {'entityId': entity_id, 'asOfTs': as_of_ts}
+
+def parse_timestamp(name, value):
+    """
+    Epoch seconds from a from/to parameter (epoch seconds or ISO 8601)
+    """
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise BadRequest(f'{name} must be epoch seconds or an ISO 8601 timestamp')
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+def parse_limit(value):
+    """
+    Page size; values above MAX_LIMIT are clamped to it
+    """
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BadRequest('limit must be a positive integer')
+    if limit < 1:
+        raise BadRequest('limit must be a positive integer')
+    return min(limit, MAX_LIMIT)
+
+def build_query(entity_id, params):
+    """
+    table.query arguments for the request's filters, projection and cursor
+    """
+    limit = parse_limit(params.get('limit', DEFAULT_LIMIT))
+    names = {}
+    values = {':eid': entity_id}
+    condition = 'entityId = :eid'
+    
+    start = parse_timestamp('from', params['from']) if params.get('from') else None
+    end = parse_timestamp('to', params['to']) if params.get('to') else None
+    
+    if start is not None and end is not None:
+        if start > end:
+            raise BadRequest('from must not be after to')
+        condition += ' AND asOfTs BETWEEN :from AND :to'
+        values[':from'] = start
+        values[':to'] = end
+    elif start is not None:
+        condition += ' AND asOfTs >= :from'
+        values[':from'] = start
+    elif end is not None:
+        condition += ' AND asOfTs <= :to'
+        values[':to'] = end
+    
+    query = {
+        'KeyConditionExpression': condition,
+        'ExpressionAttributeValues': values,
+        'ScanIndexForward': False,
+        'Limit': limit
+    }
+    
+    # Only read the requested attributes; asOfTs is always returned
+    if params.get('fields'):
+        fields = [f.strip() for f in params['fields'].split(',') if f.strip()]
+        if len(fields) > MAX_FIELDS or not all(FIELD_NAME.match(f) for f in fields):
+            raise BadRequest(f'fields must be a comma-separated list of at most {MAX_FIELDS} attribute names')
+        for field in dict.fromkeys(['asOfTs'] + fields):
+            names[f'#f{len(names)}'] = field
+        query['ProjectionExpression'] = ', '.join(names)
+        query['ExpressionAttributeNames'] = names
+    
+    if params.get('cursor'):
+        query['ExclusiveStartKey'] = decode_cursor(entity_id, params['cursor'])
+    
+    return query
 
 def handler(event, context):
     """
     Get risk history for an entity - paginated
+    Supports from/to filters on asOfTs, field projection and opaque cursors
     """
     try:
         entity_id = event['pathParameters']['id']
-        limit = int(event.get('queryStringParameters', {}).get('limit', 20))
+        params = event.get('queryStringParameters') or {}
+        
+        try:
+            query = build_query(entity_id, params)
+        except BadRequest as e:
+            return json_response(400, {'error': 'Invalid request', 'message': str(e)}, event)
         
-        # Query all risk profiles for this entity
-        response = table.query(
-            KeyConditionExpression='entityId = :eid',
-            ExpressionAttributeValues={':eid': entity_id},
-            ScanIndexForward=False,
-            Limit=limit
-        )
+        response = table.query(**query)
         
         items = response.get('Items', [])
+        last_key = response.get('LastEvaluatedKey')
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Strict-Transport-Security': 'max-age=31536000; includeSubDomains'
-            },
-            'body': json.dumps({
-                'entityId': entity_id,
-                'history': items,
-                'count': len(items)
-            }, cls=DecimalEncoder)
-        }
+        return json_response(200, {
+            'entityId': entity_id,
+            'history': items,
+            'count': len(items),
+            'nextCursor': encode_cursor(entity_id, last_key) if last_key else None
+        }, event)
         
     except Exception as e:
         print(f"Error fetching risk history: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'error': 'Internal server error'})
-        }
+        return json_response(500, {'error': 'Internal server error'}, event)
@@ -1,37 +1,259 @@
 import json
 import os
+import threading
+import time
 import boto3
-from decimal import Decimal
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-dynamodb = boto3.resource('dynamodb')
+from api_response import json_response, parse_body
+from name_index import build_index_from_table, normalize_entity_type, normalize_name
+from name_snapshot import NAME_INDEX_BUCKET, SnapshotMissing, load_snapshot
+from profile_cache import LruCache, ProfileCache
+
+# Batch screening configuration
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '10000'))
+READ_CONCURRENCY = int(os.environ.get('READ_CONCURRENCY', '16'))
+
+dynamodb = boto3.resource('dynamodb', config=Config(max_pool_connections=READ_CONCURRENCY))
 table = dynamodb.Table(os.environ['RISK_TABLE_NAME'])
 
+# Fuzzy matching configuration
+MATCH_THRESHOLD = float(os.environ.get('MATCH_THRESHOLD', '0.6'))
+MAX_CANDIDATES = int(os.environ.get('MAX_CANDIDATES', '5'))
+INDEX_TTL_SECONDS = int(os.environ.get('INDEX_TTL_SECONDS', '300'))
+
+# Profile cache: in-container LRU; the TTL bounds how stale a result can be
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', '10000'))
+PROFILE_CACHE_TTL_SECONDS = int(os.environ.get('PROFILE_CACHE_TTL_SECONDS', '5'))
+
+# Name index stays warm across invocations in the same container
+_name_index = None
+_index_etag = None
+_index_loaded_at = 0.0
+_index_refresh = threading.Lock()
+
+def load_name_index():
+    """
+    Load the name index from its S3 snapshot, if it changed since the last load
+    
+    Scans the table instead when no snapshot bucket is configured or no
+    snapshot has been written yet.
+    """
+    global _name_index, _index_etag, _index_loaded_at
+    
+    started = time.perf_counter()
+    index = None
+    try:
+        if not NAME_INDEX_BUCKET:
+            raise SnapshotMissing()
+        index, _index_etag = load_snapshot(_index_etag if _name_index is not None else None)
+        source = 'snapshot'
+    except SnapshotMissing:
+        index = build_index_from_table(table)
+        source = 'table scan'
+    
+    _index_loaded_at = time.time()
+    if index is not None:
+        _name_index = index
+        print(f"Loaded name index from {source}: {len(index)} entities in "
+              f"{(time.perf_counter() - started) * 1000:.0f}ms")
+
+def refresh_name_index():
+    try:
+        load_name_index()
+    except Exception as e:
+        print(f"Error refreshing name index, keeping the current one: {str(e)}")
+    finally:
+        _index_refresh.release()
+
+def get_name_index():
+    """
+    Return the container's name index
+    
+    Only the first call waits for it. Once it is older than
+    INDEX_TTL_SECONDS a background thread reloads it while requests keep
+    using the current one.
+    """
+    if _name_index is None:
+        with _index_refresh:
+            if _name_index is None:
+                load_name_index()
+    elif time.time() - _index_loaded_at > INDEX_TTL_SECONDS and _index_refresh.acquire(blocking=False):
+        threading.Thread(target=refresh_name_index, daemon=True).start()
+    
+    return _name_index
+
+def fetch_latest_profile(entity_id):
+    """
+    Query DynamoDB for the latest risk profile of an entity
+    Uses the low-level client, which is safe to share across reader threads
+    
+    Strongly consistent, so a profile reloaded once its cache entry expires
+    is the latest one and not a stale replica.
+    """
+    response = table.meta.client.query(
+        TableName=table.name,
+        KeyConditionExpression='entityId = :eid',
+        ExpressionAttributeValues={':eid': entity_id},
+        ScanIndexForward=False,
+        ConsistentRead=True,
+        Limit=1
+    )
+    
+    items = response.get('Items', [])
+    return items[0] if items else None
+
+# Stays warm across invocations in the same container
+profile_cache = ProfileCache(
+    fetch_latest_profile,
+    LruCache(max_entries=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL_SECONDS)
+)
+
+def screen_batch(requests, include_evidence=False):
+    """
+    Screen a list of entities in one invocation
+    
+    Identical requests are screened once, every distinct matched entity is
+    read once on a bounded thread pool, and results come back in input
+    order with per-item errors instead of failing the whole batch.
+    """
+    index = get_name_index()
+    results = [None] * len(requests)
+    unique = {}
+    
+    # Validate and dedupe requests
+    for position, request in enumerate(requests):
+        if (not isinstance(request, dict)
+                or not isinstance(request.get('name'), str) or not request['name'].strip()
+                or not isinstance(request.get('entityType'), str) or not request['entityType']):
+            results[position] = {'index': position, 'error': 'entityType and name are required strings'}
+            continue
+        if any(not isinstance(request.get(field), (str, type(None))) for field in ('dateOfBirth', 'country')):
+            results[position] = {'index': position, 'error': 'dateOfBirth and country must be strings'}
+            continue
+        
+        dedupe_key = (
+            normalize_entity_type(request['entityType']),
+            normalize_name(request['name']),
+            request.get('dateOfBirth'),
+            request.get('country')
+        )
+        unique.setdefault(dedupe_key, []).append(position)
+    
+    # Resolve names against the in-memory index (no I/O)
+    matches = {}
+    for dedupe_key, positions in unique.items():
+        request = requests[positions[0]]
+        candidates = index.search(
+            request['name'],
+            entity_type=request['entityType'],
+            limit=MAX_CANDIDATES,
+            min_score=MATCH_THRESHOLD
+        )
+        matches[dedupe_key] = candidates[0] if candidates else None
+    
+    # Read each matched entity's latest profile once, in parallel
+    entity_ids = {match['entityId'] for match in matches.values() if match}
+    profiles = {}
+    read_errors = {}
+    
+    def read(entity_id):
+        try:
+            profiles[entity_id] = profile_cache.get(entity_id)
+        except Exception as e:
+            read_errors[entity_id] = str(e)
+    
+    with ThreadPoolExecutor(max_workers=READ_CONCURRENCY) as executor:
+        list(executor.map(read, entity_ids))
+    
+    # Fan results back out to every input position
+    for dedupe_key, positions in unique.items():
+        request = requests[positions[0]]
+        match = matches[dedupe_key]
+        entity_id = match['entityId'] if match else None
+        
+        if entity_id in read_errors:
+            print(f"Error reading profile {entity_id}: {read_errors[entity_id]}")
+            result = {'error': 'Profile lookup failed'}
+        else:
+            item = profiles.get(entity_id)
+            result = {
+                'entityId': entity_id,
+                'riskScore': float(item['score']) if item else 0.0,
+                'status': item['status'] if item else 'CLEAR',
+                'matchScore': match['score'] if match else 0.0,
+                'matchedName': match['matchedName'] if match else None
+            }
+            if include_evidence:
+                result['evidence'] = item.get('evidence', []) if item else []
+        
+        for position in positions:
+            results[position] = {'index': position, **result}
+    
+    failed = sum(1 for result in results if 'error' in result)
+    
+    return {
+        'results': results,
+        'summary': {
+            'total': len(requests),
+            'unique': len(unique),
+            'profilesRead': len(entity_ids),
+            'succeeded': len(requests) - failed,
+            'failed': failed
+        },
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
 def handler(event, context):
     """
     Screen entity for risk - API endpoint handler
     Returns risk score, status, and evidence
     """
     try:
-        body = json.loads(event['body'])
+        body = parse_body(event)
+        
+        # Batch mode: {"entities": [{entityType, name, dateOfBirth, country}, ...]}
+        if 'entities' in body:
+            requests = body['entities']
+            if not isinstance(requests, list) or len(requests) > MAX_BATCH_SIZE:
+                return json_response(400, {
+                    'error': 'Invalid request',
+                    'message': f'entities must be a list of at most {MAX_BATCH_SIZE} items'
+                }, event)
+            
+            return json_response(
+                200,
+                screen_batch(requests, include_evidence=body.get('includeEvidence', False)),
+                event
+            )
+        
         entity_type = body['entityType']
         name = body['name']
         dob = body.get('dateOfBirth')
         country = body.get('country')
         
-        # Generate entity ID (in production: use deterministic hash)
-        entity_id = f"{entity_type}:{name.lower().replace(' ', '_')}"
-        
-        # Query DynamoDB for latest risk profile
-        response = table.query(
-            KeyConditionExpression='entityId = :eid',
-            ExpressionAttributeValues={':eid': entity_id},
-            ScanIndexForward=False,
-            Limit=1
+        # Fuzzy match against known entities and aliases
+        candidates = get_name_index().search(
+            name,
+            entity_type=entity_type,
+            limit=MAX_CANDIDATES,
+            min_score=MATCH_THRESHOLD
         )
         
-        if response['Items']:
-            item = response['Items'][0]
+        if candidates:
+            best_match = candidates[0]
+            entity_id = best_match['entityId']
+            
+            # Latest risk profile, from cache when hot
+            item = profile_cache.get(entity_id)
+        else:
+            best_match = None
+            entity_id = None
+            item = None
+        
+        if item:
             risk_score = float(item['score'])
             status = item['status']
             evidence = item.get('evidence', [])
@@ -41,25 +263,17 @@ def handler(event, context):
             status = 'CLEAR'
             evidence = []
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Strict-Transport-Security': 'max-age=31536000; includeSubDomains'
-            },
-            'body': json.dumps({
-                'entityId': entity_id,
-                'riskScore': risk_score,
-                'status': status,
-                'evidence': evidence,
-                'timestamp': datetime.utcnow().isoformat()
-            })
-        }
+        return json_response(200, {
+            'entityId': entity_id,
+            'riskScore': risk_score,
+            'status': status,
+            'evidence': evidence,
+            'matchScore': best_match['score'] if best_match else 0.0,
+            'matchedName': best_match['matchedName'] if best_match else None,
+            'candidates': candidates,
+            'timestamp': datetime.utcnow().isoformat()
+        }, event)
         
     except Exception as e:
         print(f"Error screening entity: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'error': 'Internal server error'})
-        }
+        return json_response(500, {'error': 'Internal server error'}, event)
@@ -0,0 +1,285 @@
+"""
+In-memory fuzzy name-match index for entity screening
+
+Built once per Lambda container from the RiskProfiles table and kept warm
+between invocations, so a lookup is a handful of dictionary hits instead of
+a DynamoDB round trip. Names and aliases are indexed by character trigrams
+and by per-token Soundex keys, which lets "Victor Bout" find "Viktor Bout".
+
+Similarity is symmetric (Jaccard over trigrams and over phonetic keys), so
+a short query like "John" doesn't score high against every longer name
+that contains it. Since the phonetic term adds at most PHONETIC_WEIGHT, a
+variant can only reach min_score with a minimum trigram overlap; candidates
+are taken from the postings of the query's rarest trigrams and checked
+against that bound before being scored.
+"""
+
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+
+# Letter groups for Soundex phonetic keys
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6'
+}
+
+# API entity types → types written by the NLP pipeline
+ENTITY_TYPE_ALIASES = {
+    'PERSON': 'PERSON',
+    'COMPANY': 'ORGANIZATION',
+    'ORGANIZATION': 'ORGANIZATION',
+    'ORG': 'ORGANIZATION'
+}
+
+TRIGRAM_WEIGHT = 0.7
+PHONETIC_WEIGHT = 0.3
+
+def normalize_name(name):
+    """
+    Lowercase, strip accents and punctuation, collapse whitespace
+    """
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^a-z0-9]+', ' ', text.lower())
+    return ' '.join(text.split())
+
+def normalize_entity_type(entity_type):
+    """
+    Map API and pipeline entity types onto a common vocabulary
+    """
+    if not entity_type:
+        return None
+    return ENTITY_TYPE_ALIASES.get(entity_type.upper(), entity_type.upper())
+
+def trigrams(normalized):
+    """
+    Character trigrams of a normalized name, padded at word boundaries
+    """
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def soundex(token):
+    """
+    Four-character Soundex key for a single name token
+    """
+    if not token:
+        return ''
+    if not token[0].isalpha():
+        return token
+    
+    key = token[0].upper()
+    last_code = SOUNDEX_CODES.get(token[0], '')
+    
+    for char in token[1:]:
+        code = SOUNDEX_CODES.get(char, '')
+        if code and code != last_code:
+            key += code
+            if len(key) == 4:
+                break
+        # 'h' and 'w' do not separate letters with the same code
+        if char not in 'hw':
+            last_code = code
+    
+    return key.ljust(4, '0')
+
+def phonetic_keys(normalized):
+    """
+    Set of Soundex keys for every token in a normalized name
+    """
+    return {soundex(token) for token in normalized.split()}
+
+class NameIndex:
+    """
+    Trigram and phonetic postings over entity names and aliases
+    
+    Each indexed name variant gets an integer id; postings map trigrams and
+    Soundex keys to variant ids, and every variant points back to its entity.
+    """
+    
+    def __init__(self):
+        self.entities = {}
+        self.variants = []
+        self.trigram_postings = {}
+        self.phonetic_postings = {}
+    
+    def __len__(self):
+        return len(self.entities)
+    
+    def add(self, entity_id, name, aliases=None, entity_type=None):
+        """
+        Index an entity's canonical name and aliases
+        """
+        if entity_id in self.entities:
+            return
+        
+        self.entities[entity_id] = {
+            'entityId': entity_id,
+            'name': name,
+            'entityType': normalize_entity_type(entity_type)
+        }
+        
+        seen = set()
+        for variant in [name] + list(aliases or []):
+            normalized = normalize_name(variant)
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            
+            variant_id = len(self.variants)
+            grams = trigrams(normalized)
+            keys = phonetic_keys(normalized)
+            self.variants.append((entity_id, variant, len(grams), frozenset(keys)))
+            
+            for gram in grams:
+                self.trigram_postings.setdefault(gram, []).append(variant_id)
+            for key in keys:
+                self.phonetic_postings.setdefault(key, []).append(variant_id)
+    
+    def search(self, name, entity_type=None, limit=5, min_score=0.0):
+        """
+        Rank indexed entities by similarity to a query name
+        
+        Returns up to `limit` candidates, best first, each with the alias
+        that matched and a 0-1 similarity score.
+        """
+        normalized = normalize_name(name)
+        if not normalized:
+            return []
+        
+        query_grams = trigrams(normalized)
+        query_keys = phonetic_keys(normalized)
+        wanted_type = normalize_entity_type(entity_type)
+        
+        # Lowest trigram similarity that can still reach min_score
+        min_similarity = (min_score - PHONETIC_WEIGHT) / TRIGRAM_WEIGHT
+        
+        best = {}
+        for variant_id, overlap in self._candidates(query_grams, query_keys, min_similarity):
+            entity_id, variant, gram_count, keys = self.variants[variant_id]
+            
+            indexed_type = self.entities[entity_id]['entityType']
+            if wanted_type and indexed_type and wanted_type != indexed_type:
+                continue
+            
+            similarity = overlap / (len(query_grams) + gram_count - overlap)
+            phonetic = len(query_keys & keys) / len(query_keys | keys)
+            
+            score = TRIGRAM_WEIGHT * similarity + PHONETIC_WEIGHT * phonetic
+            
+            if score >= min_score and score > best.get(entity_id, (0.0, None))[0]:
+                best[entity_id] = (score, variant)
+        
+        ranked = sorted(best.items(), key=lambda kv: kv[1][0], reverse=True)[:limit]
+        
+        return [
+            {
+                'entityId': entity_id,
+                'name': self.entities[entity_id]['name'],
+                'matchedName': variant,
+                'score': round(score, 4)
+            }
+            for entity_id, (score, variant) in ranked
+        ]
+    
+    def _candidates(self, query_grams, query_keys, min_similarity):
+        """
+        (variant id, trigram overlap) of every variant whose trigram
+        similarity to the query can be at least min_similarity
+        """
+        postings = sorted((self.trigram_postings.get(gram, []) for gram in query_grams), key=len)
+        
+        if min_similarity <= 0:
+            # Any phonetic match alone may be enough
+            overlaps = Counter()
+            for posting in postings:
+                overlaps.update(posting)
+            for key in query_keys:
+                for variant_id in self.phonetic_postings.get(key, ()):
+                    overlaps.setdefault(variant_id, 0)
+            return overlaps.items()
+        
+        # Jaccard >= t needs an overlap of at least t * |query| and a variant
+        # of t * |query| to |query| / t trigrams; such a variant shares at
+        # least one of the |query| - min_overlap + 1 rarest query trigrams
+        query_count = len(query_grams)
+        min_overlap = max(1, math.ceil(min_similarity * query_count - 1e-9))
+        min_count = min_similarity * query_count
+        max_count = query_count / min_similarity
+        split = query_count - min_overlap + 1
+        
+        overlaps = Counter()
+        for posting in postings[:split]:
+            overlaps.update(posting)
+        
+        results = []
+        for variant_id, overlap in overlaps.items():
+            gram_count = self.variants[variant_id][2]
+            if gram_count < min_count or gram_count > max_count:
+                continue
+            if overlap + query_count - split < min_overlap:
+                continue
+            # Postings are in variant id order, so the common trigrams are
+            # checked by binary search instead of being walked
+            for posting in postings[split:]:
+                position = bisect_left(posting, variant_id)
+                if position < len(posting) and posting[position] == variant_id:
+                    overlap += 1
+            if overlap >= min_overlap:
+                results.append((variant_id, overlap))
+        return results
+
+def latest_profiles(table):
+    """
+    (entityId, name, aliases, entityType) of every entity's latest profile
+    
+    Runs a paginated, projected scan; config items are skipped.
+    """
+    latest = {}
+    scan_kwargs = {
+        'ProjectionExpression': 'entityId, asOfTs, #n, aliases, entityType',
+        'ExpressionAttributeNames': {'#n': 'name'}
+    }
+    
+    while True:
+        response = table.scan(**scan_kwargs)
+        
+        for item in response.get('Items', []):
+            entity_id = item['entityId']
+            if entity_id.startswith('CONFIG:'):
+                continue
+            if entity_id not in latest or item.get('asOfTs', 0) > latest[entity_id].get('asOfTs', 0):
+                latest[entity_id] = item
+        
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    for entity_id, item in latest.items():
+        entity_type = item.get('entityType')
+        if not entity_type and ':' in entity_id:
+            entity_type = entity_id.split(':', 1)[0]
+        yield entity_id, item.get('name', ''), list(item.get('aliases', [])), entity_type
+
+def build_index(entries):
+    """
+    Build a NameIndex from (entityId, name, aliases, entityType) entries
+    """
+    index = NameIndex()
+    for entity_id, name, aliases, entity_type in entries:
+        index.add(entity_id, name, aliases, entity_type)
+    return index
+
+def build_index_from_table(table):
+    """
+    Build a NameIndex from every risk profile in the table
+    
+    Only the latest profile version of each entity is indexed.
+    """
+    return build_index(latest_profiles(table))
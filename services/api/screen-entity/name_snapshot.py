@@ -0,0 +1,89 @@
+"""
+Compact snapshot of the name index, kept in S3
+
+Building the index from the table means a full scan over every history
+version of every profile. Instead of each screening container doing that
+itself, a scheduled job scans once and writes only what the index needs:
+one gzip NDJSON line per entity's latest profile. Containers load the
+snapshot (a single GET) and re-check it with its ETag, so an unchanged
+snapshot isn't downloaded again.
+"""
+
+import gzip
+import json
+import os
+import boto3
+from botocore.exceptions import ClientError
+
+from name_index import build_index, latest_profiles
+
+NAME_INDEX_BUCKET = os.environ.get('NAME_INDEX_BUCKET')
+NAME_INDEX_KEY = os.environ.get('NAME_INDEX_KEY', 'indexes/name-index.ndjson.gz')
+
+s3 = boto3.client('s3')
+
+class SnapshotMissing(Exception):
+    pass
+
+def encode_snapshot(entries):
+    """
+    Gzip NDJSON body for (entityId, name, aliases, entityType) entries
+    """
+    lines = (json.dumps(list(entry), separators=(',', ':')) for entry in entries)
+    return gzip.compress('\n'.join(lines).encode('utf-8'))
+
+def decode_snapshot(body):
+    """
+    (entityId, name, aliases, entityType) entries of a snapshot body
+    """
+    for line in gzip.decompress(body).decode('utf-8').splitlines():
+        if line:
+            yield tuple(json.loads(line))
+
+def load_snapshot(etag=None):
+    """
+    (NameIndex, ETag) from the snapshot, or (None, etag) if it still has etag
+    
+    Raises SnapshotMissing if no snapshot has been written yet.
+    """
+    request = {'Bucket': NAME_INDEX_BUCKET, 'Key': NAME_INDEX_KEY}
+    if etag:
+        request['IfNoneMatch'] = etag
+    
+    try:
+        response = s3.get_object(**request)
+    except ClientError as e:
+        code = e.response.get('Error', {}).get('Code')
+        if code in ('304', 'NotModified'):
+            return None, etag
+        if code in ('NoSuchKey', '404'):
+            raise SnapshotMissing(NAME_INDEX_KEY)
+        raise
+    
+    index = build_index(decode_snapshot(response['Body'].read()))
+    return index, response.get('ETag')
+
+def handler(event, context):
+    """
+    Scan the risk table and write a fresh name index snapshot (scheduled)
+    """
+    table = boto3.resource('dynamodb').Table(os.environ['RISK_TABLE_NAME'])
+    
+    entries = list(latest_profiles(table))
+    body = encode_snapshot(entries)
+    
+    s3.put_object(
+        Bucket=NAME_INDEX_BUCKET,
+        Key=NAME_INDEX_KEY,
+        Body=body,
+        ContentType='application/gzip'
+    )
+    
+    print(json.dumps({
+        'event': 'NAME_INDEX_SNAPSHOT_WRITTEN',
+        'entities': len(entries),
+        'bytes': len(body),
+        'key': NAME_INDEX_KEY
+    }))
+    
+    return {'statusCode': 200, 'entities': len(entries)}
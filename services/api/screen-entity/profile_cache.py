@@ -0,0 +1,74 @@
+"""
+Read-through cache for latest risk profiles
+
+An LRU inside the Lambda container with a short per-entry TTL. Screening
+traffic keeps hitting the same counterparties, so repeated lookups within
+a batch or across back-to-back requests are served from memory. Entities
+without a profile are cached too, as most screened names never match one.
+
+Nothing evicts entries early: a rescored profile is picked up once its
+entry expires, so results are at most the TTL behind DynamoDB.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Cached "no profile" is None, so a miss needs its own marker
+MISSING = object()
+
+class LruCache:
+    """
+    Thread-safe LRU with a per-entry TTL
+    """
+    
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires = entry
+            if time.monotonic() >= expires:
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def __len__(self):
+        return len(self.entries)
+
+class ProfileCache:
+    """
+    Read-through cache of latest profiles by entityId
+    
+    loader(entity_id) reads the profile from DynamoDB (None if there is none).
+    """
+    
+    def __init__(self, loader, local):
+        self.loader = loader
+        self.local = local
+        self.stats = {'local': 0, 'loads': 0}
+    
+    def get(self, entity_id):
+        value = self.local.get(entity_id)
+        if value is not MISSING:
+            self.stats['local'] += 1
+            return value
+        
+        value = self.loader(entity_id)
+        self.stats['loads'] += 1
+        self.local.set(entity_id, value)
+        return value
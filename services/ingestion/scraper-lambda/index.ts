@@ -3,12 +3,15 @@
  * Cost: ~$0.20 per 1M requests vs Fargate ~$30/month
  */
 
-import { S3Client, PutObjectCommand } from '@aws-sdk/client-s3';
+import { S3Client, PutObjectCommand, GetObjectCommand } from '@aws-sdk/client-s3';
 import axios from 'axios';
 import * as cheerio from 'cheerio';
+import { createHash } from 'crypto';
 
 const s3Client = new S3Client({});
 const RAW_BUCKET = process.env.RAW_BUCKET || 'aegis-raw-data-dev';
+// Same layout as the Fargate scraper's validator cache (page_cache.py)
+const HTTP_CACHE_PREFIX = 'state/http-cache';
 
 interface SourceConfig {
   name: string;
@@ -22,6 +25,20 @@ interface SourceConfig {
   };
 }
 
+interface Validators {
+  url: string;
+  etag?: string;
+  lastModified?: string;
+  // Start of the date range the run that stored these extracted
+  rangeStart: string;
+  fetchedAt: string;
+}
+
+interface ScrapeResult {
+  data: any;
+  validators: Validators | null;
+}
+
 interface ScrapedRecord {
   name: string;
   entityType: string;
@@ -44,7 +61,19 @@ export const handler = async (event: any) => {
     try {
       console.log(`Scraping ${source.name}...`);
 
-      const data = await scrapeSource(source, scrapeMode, lookbackDays);
+      const result = await scrapeSource(source, scrapeMode, lookbackDays);
+
+      // 304 Not Modified: nothing to parse or upload
+      if (result === null) {
+        console.log(`✓ ${source.name} not modified since the last run, skipping`);
+        results.push({
+          source: source.name,
+          status: 'not_modified',
+        });
+        continue;
+      }
+
+      const { data, validators } = result;
 
       // Upload to S3
       const key = `raw/${new Date().toISOString().split('T')[0]}/${source.name}_${Date.now()}.json`;
@@ -61,6 +90,11 @@ export const handler = async (event: any) => {
 
       console.log(`✓ Uploaded to s3://${RAW_BUCKET}/${key}`);
 
+      // Only remember validators once the output is safely stored
+      if (validators) {
+        await saveValidators(validators);
+      }
+
       results.push({
         source: source.name,
         status: 'success',
@@ -86,22 +120,87 @@ export const handler = async (event: any) => {
   };
 };
 
+function validatorsKey(url: string): string {
+  return `${HTTP_CACHE_PREFIX}/${createHash('sha256').update(url).digest('hex')}.json`;
+}
+
+/**
+ * Conditional request headers from the validators stored by the last successful run
+ *
+ * A 304 only means that run's records are still complete, so a run reaching
+ * further back than it did (e.g. a larger lookback) fetches unconditionally.
+ */
+async function loadConditionalHeaders(url: string, rangeStart: Date): Promise<Record<string, string>> {
+  try {
+    const response = await s3Client.send(
+      new GetObjectCommand({ Bucket: RAW_BUCKET, Key: validatorsKey(url) })
+    );
+    const cached: Validators = JSON.parse(await response.Body!.transformToString());
+    if (!cached.rangeStart || new Date(cached.rangeStart) > rangeStart) {
+      return {};
+    }
+    const headers: Record<string, string> = {};
+    if (cached.etag) headers['If-None-Match'] = cached.etag;
+    if (cached.lastModified) headers['If-Modified-Since'] = cached.lastModified;
+    return headers;
+  } catch (error: any) {
+    if (error?.name === 'NoSuchKey' || error?.$metadata?.httpStatusCode === 404) {
+      return {};
+    }
+    throw error;
+  }
+}
+
+async function saveValidators(validators: Validators): Promise<void> {
+  await s3Client.send(
+    new PutObjectCommand({
+      Bucket: RAW_BUCKET,
+      Key: validatorsKey(validators.url),
+      Body: JSON.stringify(validators),
+      ContentType: 'application/json',
+      ServerSideEncryption: 'AES256',
+    })
+  );
+}
+
+/**
+ * Returns null when the source answers 304 to a conditional GET
+ */
 async function scrapeSource(
   source: SourceConfig,
   scrapeMode: string,
   lookbackDays: number
-): Promise<any> {
+): Promise<ScrapeResult | null> {
   const startDate = new Date();
   startDate.setDate(startDate.getDate() - lookbackDays);
 
-  // Fetch HTML
+  // Fetch HTML (conditional on the validators from the last run)
   const response = await axios.get(source.url, {
     headers: {
       'User-Agent': 'AEGIS Risk Intelligence Bot/1.0',
+      ...(await loadConditionalHeaders(source.url, startDate)),
     },
     timeout: 25000, // Lambda has 30s timeout
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
   });
 
+  if (response.status === 304) {
+    return null;
+  }
+
+  const etag = response.headers['etag'];
+  const lastModified = response.headers['last-modified'];
+  const validators: Validators | null =
+    etag || lastModified
+      ? {
+          url: source.url,
+          etag,
+          lastModified,
+          rangeStart: startDate.toISOString(),
+          fetchedAt: new Date().toISOString(),
+        }
+      : null;
+
   const html = response.data;
   const $ = cheerio.load(html);
 
@@ -116,7 +215,7 @@ async function scrapeSource(
     records.push(...scrapeGeneric($, source));
   }
 
-  return {
+  const data = {
     source: source.url,
     sourceType: source.type,
     scrapedAt: new Date().toISOString(),
@@ -127,6 +226,8 @@ async function scrapeSource(
     recordCount: records.length,
     records,
   };
+
+  return { data, validators };
 }
 
 function scrapeSanctionsList($: cheerio.CheerioAPI, source: SourceConfig): ScrapedRecord[] {
@@ -0,0 +1,122 @@
+"""
+Reusable headless Chrome drivers and per-domain concurrency limits
+
+Starting Chrome costs seconds and hundreds of MB, so worker threads borrow
+drivers from a fixed-size pool instead of launching one per source.
+"""
+
+import queue
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+class DriverPool:
+    """
+    Fixed-size pool of lazily created WebDriver instances
+    """
+    
+    def __init__(self, size, factory):
+        self.size = size
+        self.factory = factory
+        self.idle = queue.Queue()
+        self.created = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.all_drivers = []
+    
+    def _checkout(self, timeout=None):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                create = True
+            else:
+                create = False
+        
+        if create:
+            try:
+                driver = self.factory()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+            with self.lock:
+                self.all_drivers.append(driver)
+            return driver
+        
+        return self.idle.get(timeout=timeout)
+    
+    def _discard(self, driver):
+        with self.lock:
+            self.created -= 1
+            if driver in self.all_drivers:
+                self.all_drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    
+    @contextmanager
+    def driver(self, timeout=None):
+        """
+        Borrow a driver; it is reset and returned to the pool afterwards
+        
+        A driver that raised is assumed broken and replaced on next demand.
+        """
+        if self.closed:
+            raise RuntimeError('Driver pool is closed')
+        
+        driver = self._checkout(timeout=timeout)
+        healthy = False
+        
+        try:
+            yield driver
+            healthy = True
+        finally:
+            if healthy and not self.closed:
+                try:
+                    driver.delete_all_cookies()
+                    driver.get('about:blank')
+                    self.idle.put(driver)
+                except Exception:
+                    self._discard(driver)
+            else:
+                self._discard(driver)
+    
+    def close(self):
+        """
+        Quit every driver, including ones still in use (aborts their work)
+        """
+        self.closed = True
+        with self.lock:
+            drivers = list(self.all_drivers)
+            self.all_drivers = []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+class DomainLimiter:
+    """
+    Caps concurrent work per domain so parallel sources don't hammer one host
+    """
+    
+    def __init__(self, max_per_domain):
+        self.max_per_domain = max_per_domain
+        self.semaphores = {}
+        self.lock = threading.Lock()
+    
+    @contextmanager
+    def limit(self, url):
+        domain = urlparse(url).netloc.lower()
+        
+        with self.lock:
+            semaphore = self.semaphores.setdefault(domain, threading.BoundedSemaphore(self.max_per_domain))
+        
+        with semaphore:
+            yield
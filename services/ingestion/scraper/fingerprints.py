@@ -0,0 +1,129 @@
+"""
+Per-source record fingerprints for change detection
+
+Each record gets a stable key (what the record is about) and a content hash
+(what it currently says). Comparing a scrape against the fingerprints of the
+previous run yields only the records that were added, changed or removed, so
+unchanged entries no longer flow through NER, resolution and scoring again.
+
+Fingerprints are kept as one gzip JSON file per source in the raw bucket,
+outside the raw/ prefix that triggers the pipeline.
+"""
+
+import gzip
+import hashlib
+import json
+import re
+
+from botocore.exceptions import ClientError
+
+# Fields that change on every scrape without the record itself changing
+VOLATILE_FIELDS = {'scrapedAt', 'changeType', 'recordKey'}
+
+def record_key(record):
+    """
+    Stable identity for a record
+    
+    Uses a source-provided identifier when there is one, otherwise the
+    normalized name and entity type. Records without a name (e.g. generic
+    page content) are identified by their content.
+    """
+    metadata = record.get('metadata') or {}
+    source_id = record.get('id') or metadata.get('uid') or metadata.get('id')
+    if source_id:
+        return f"id:{source_id}"
+    
+    name = re.sub(r'\s+', ' ', record.get('name') or record.get('title') or '').strip().lower()
+    if name:
+        return f"name:{(record.get('entityType') or '').strip().lower()}|{name}"
+    
+    return f"content:{content_hash(record)}"
+
+def content_hash(record):
+    """
+    SHA-256 of the record's canonical JSON, ignoring volatile fields
+    """
+    stable = {k: v for k, v in record.items() if k not in VOLATILE_FIELDS}
+    canonical = json.dumps(stable, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class FingerprintStore:
+    """
+    Fingerprints from the previous run of one source, and the delta against them
+    """
+    
+    def __init__(self, s3_client, bucket, source_name, prefix='state/fingerprints'):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = f"{prefix}/{source_name}.json.gz"
+        self.previous = None
+        self.current = {}
+        self.counts = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+    
+    def load(self):
+        """
+        Fetch the stored fingerprints; a source seen for the first time has none
+        """
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=self.key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                raise
+            self.previous = {}
+            return self
+        
+        self.previous = json.loads(gzip.decompress(response['Body'].read()))
+        return self
+    
+    def diff(self, records, complete=False):
+        """
+        Yield added and changed records tagged with changeType and recordKey
+        
+        With complete=True (the scrape covered the whole source, e.g. a bulk
+        export) previously seen keys that are missing are yielded as removed.
+        Partial scrapes (date-filtered or page-limited) never remove anything.
+        """
+        if self.previous is None:
+            self.load()
+        
+        for record in records:
+            key = record_key(record)
+            fingerprint = content_hash(record)
+            self.current[key] = {'hash': fingerprint, 'name': record.get('name')}
+            
+            previous = self.previous.get(key)
+            if previous is None:
+                change_type = 'added'
+            elif previous['hash'] != fingerprint:
+                change_type = 'changed'
+            else:
+                self.counts['unchanged'] += 1
+                continue
+            
+            self.counts[change_type] += 1
+            yield {**record, 'recordKey': key, 'changeType': change_type}
+        
+        if not complete:
+            return
+        
+        for key, previous in self.previous.items():
+            if key not in self.current:
+                self.counts['removed'] += 1
+                yield {'name': previous.get('name'), 'recordKey': key, 'changeType': 'removed'}
+    
+    def save(self, complete=False):
+        """
+        Persist fingerprints for the next run
+        
+        Partial scrapes merge into the stored set; complete ones replace it,
+        which drops the removed keys.
+        """
+        fingerprints = self.current if complete else {**self.previous, **self.current}
+        
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Body=gzip.compress(json.dumps(fingerprints, separators=(',', ':')).encode('utf-8')),
+            ContentType='application/json',
+            ServerSideEncryption='aws:kms'
+        )
@@ -0,0 +1,378 @@
+"""
+Lightweight HTTP fetch engine for static and structured sources
+
+Static HTML, XML and CSV lists (OFAC SDN, UN consolidated list) don't need
+a browser. Pages are fetched over pooled keep-alive connections and parsed
+with lxml, which uses a fraction of Chrome's memory per task.
+"""
+
+import csv
+import io
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from rate_limiter import THROTTLE_STATUSES, rate_limiter
+
+USER_AGENT = 'AEGIS Risk Intelligence Bot/1.0 (compliance@example.com)'
+POOL_SIZE = 10
+REQUEST_TIMEOUT = 30
+MAX_THROTTLE_RETRIES = 5  # 429/503 responses retried after the limiter's pause
+
+# Source types served as static pages unless the source config overrides it;
+# only types with an HTML parser here belong in this set
+HTTP_SOURCE_TYPES = {'sanctions_list'}
+STRUCTURED_FORMATS = {'xml', 'csv'}
+
+_local = threading.local()
+
+def get_session():
+    """
+    Per-thread requests session with a keep-alive connection pool
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['User-Agent'] = USER_AGENT
+        _local.session = session
+    return session
+
+def choose_engine(source_config):
+    """
+    'http' for static/structured sources, 'browser' for JS-rendered pages
+    An explicit "fetch" setting in the source config wins
+    """
+    if source_config.get('fetch') in ('http', 'browser'):
+        return source_config['fetch']
+    if source_config.get('format') in STRUCTURED_FORMATS:
+        return 'http'
+    if source_config.get('type') in HTTP_SOURCE_TYPES:
+        return 'http'
+    return 'browser'
+
+def detect_format(source_config, response):
+    """
+    Payload format from the source config, falling back to Content-Type
+    """
+    if source_config.get('format'):
+        return source_config['format']
+    
+    content_type = response.headers.get('Content-Type', '').lower()
+    if 'xml' in content_type and 'html' not in content_type:
+        return 'xml'
+    if 'csv' in content_type:
+        return 'csv'
+    return 'html'
+
+def get_selectors(config):
+    """
+    CSS selectors for a source, accepting flat or nested "selectors" config
+    """
+    return {
+        'entry_selector': '.sanction-entry',
+        'name': '.name',
+        'type': '.type',
+        'date_added': '.date-added',
+        'next_button': '.next-page',
+        **{k: v for k, v in config.items() if k in ('entry_selector', 'next_button')},
+        **config.get('selectors', {})
+    }
+
+def parse_date(value):
+    """
+    Parse an ISO-style date, returning None if it isn't one
+    """
+    try:
+        return datetime.strptime(value.strip()[:10], '%Y-%m-%d')
+    except (ValueError, AttributeError):
+        return None
+
+def sanctions_record(name, entity_type, date_added, aliases=None, metadata=None):
+    """
+    Normalized sanctions record, same shape as the Selenium scraper's
+    """
+    return {
+        'name': name,
+        'entityType': entity_type,
+        'dateAdded': date_added.isoformat() if date_added else None,
+        'source': 'sanctions_list',
+        'aliases': aliases or [],
+        'metadata': metadata or {}
+    }
+
+def next_page(soup, selector):
+    """
+    (has_next, url) for a page's next control
+    
+    A missing or disabled control means this is the last page. An enabled
+    control without a followable href (a script-driven <button>) has a next
+    page that only a browser can reach, so url is None.
+    """
+    control = soup.select_one(selector)
+    if control is None or control.has_attr('disabled') or control.get('aria-disabled') == 'true':
+        return False, None
+    
+    href = (control.get('href') or '').strip()
+    if not href or href.startswith('#') or href.lower().startswith('javascript:'):
+        return True, None
+    return True, href
+
+def parse_sanctions_html(html, config, start_date, end_date):
+    """
+    Extract sanctions entries from a static HTML page
+    
+    Returns (records, entry_count, has_next, next_url); entry_count is the
+    number of entries matched before date filtering, so callers can tell an
+    empty date window from a page that needs JavaScript to render. Entries
+    without a type or a parseable date are dropped, as the Selenium scraper
+    does.
+    """
+    selectors = get_selectors(config)
+    soup = BeautifulSoup(html, 'lxml')
+    entries = soup.select(selectors['entry_selector'])
+    records = []
+    
+    for entry in entries:
+        name_el = entry.select_one(selectors['name'])
+        if name_el is None:
+            continue
+        
+        type_el = entry.select_one(selectors['type'])
+        date_el = entry.select_one(selectors['date_added'])
+        date_added = parse_date(date_el.get_text()) if date_el else None
+        if type_el is None or date_added is None:
+            continue
+        
+        # Filter by date range
+        if not start_date <= date_added <= end_date:
+            continue
+        
+        records.append(sanctions_record(
+            name_el.get_text(strip=True),
+            type_el.get_text(strip=True),
+            date_added
+        ))
+    
+    has_next, next_url = next_page(soup, selectors['next_button'])
+    
+    return records, len(entries), has_next, next_url
+
+def parse_xml_records(source, config):
+    """
+    Yield one normalized record per entry element of an XML list
+    
+    `source` is bytes or a binary file object; elements are cleared once
+    read so memory doesn't grow with document size. Config keys:
+    record_tag (default "entry"), name_tag, type_tag, date_tag, alias_tag.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    
+    record_tag = config.get('record_tag', 'entry')
+    name_tag = config.get('name_tag', 'name')
+    type_tag = config.get('type_tag', 'type')
+    date_tag = config.get('date_tag', 'dateAdded')
+    alias_tag = config.get('alias_tag', 'alias')
+    
+    for _, element in etree.iterparse(source, events=('end',), tag=f'{{*}}{record_tag}', recover=True):
+        fields = {}
+        aliases = []
+        for child in element.iter():
+            if child is element or not isinstance(child.tag, str):
+                continue
+            tag = etree.QName(child).localname
+            text = (child.text or '').strip()
+            if not text:
+                continue
+            if tag == alias_tag:
+                aliases.append(text)
+            else:
+                fields.setdefault(tag, text)
+        
+        name = fields.pop(name_tag, '')
+        if name:
+            yield sanctions_record(
+                name,
+                fields.pop(type_tag, ''),
+                parse_date(fields.pop(date_tag, '')),
+                aliases,
+                fields
+            )
+        
+        # Free the parsed subtree and already-processed siblings
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+def parse_csv_records(lines, config):
+    """
+    Yield one normalized record per CSV row
+    
+    `lines` is any iterable of text lines. Config keys: name_column,
+    type_column, date_column, alias_column (aliases split on ";").
+    """
+    name_column = config.get('name_column', 'name')
+    type_column = config.get('type_column', 'type')
+    date_column = config.get('date_column', 'dateAdded')
+    alias_column = config.get('alias_column', 'aliases')
+    
+    for row in csv.DictReader(lines):
+        name = (row.pop(name_column, '') or '').strip()
+        if not name:
+            continue
+        aliases = [a.strip() for a in (row.pop(alias_column, '') or '').split(';') if a.strip()]
+        yield sanctions_record(
+            name,
+            (row.pop(type_column, '') or '').strip(),
+            parse_date(row.pop(date_column, '') or ''),
+            aliases,
+            {k: v for k, v in row.items() if k and v}
+        )
+
+class DeadlineExceeded(Exception):
+    """
+    The run deadline passed while a scrape was still in progress
+    """
+
+def check_deadline(deadline):
+    """
+    Raise DeadlineExceeded once time.monotonic() reaches deadline (None = no deadline)
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded('run deadline reached')
+
+def in_date_range(record, start_date, end_date):
+    """
+    Date filter for structured records; undated records are kept
+    """
+    if not record.get('dateAdded'):
+        return True
+    return start_date <= datetime.fromisoformat(record['dateAdded']) <= end_date
+
+def fetch(url, headers=None, **kwargs):
+    """
+    GET through the per-domain adaptive rate limiter
+    
+    Every response feeds the limiter; 429/503 slow the domain down (and pause
+    it for Retry-After) and are retried up to MAX_THROTTLE_RETRIES times.
+    """
+    session = get_session()
+    
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        rate_limiter.acquire(url)
+        started = time.monotonic()
+        response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT, **kwargs)
+        rate_limiter.record(url, time.monotonic() - started, response.status_code, response.headers.get('Retry-After'))
+        
+        if response.status_code not in THROTTLE_STATUSES or attempt == MAX_THROTTLE_RETRIES:
+            return response
+        
+        print(f"{url} answered {response.status_code}, retrying at {rate_limiter.rate(url):.2f} req/s")
+        response.close()
+
+def conditional_get(url, validators, **kwargs):
+    """
+    GET with If-None-Match / If-Modified-Since from the validator cache
+    Raises NotModified on a 304; without a cache this is a plain GET
+    """
+    if validators is None:
+        return fetch(url, **kwargs)
+    
+    response = fetch(url, headers=validators.headers_for(url), **kwargs)
+    try:
+        validators.check(url, response)
+    except Exception:
+        response.close()
+        raise
+    return response
+
+def probe(url, validators):
+    """
+    Conditional GET without reading the body, to skip a browser scrape
+    of an unchanged page before Chrome is started
+    """
+    conditional_get(url, validators, stream=True).close()
+
+def stream_bulk_records(source_config, validators=None, deadline=None):
+    """
+    Stream-parse a source's official bulk export (XML or CSV)
+    
+    Yields normalized records while the download is still in progress;
+    nothing beyond the current element/row is kept in memory. Raises
+    DeadlineExceeded between records once the run deadline has passed.
+    """
+    with conditional_get(source_config['bulkUrl'], validators, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        payload_format = source_config.get('format') or detect_format(source_config, response)
+        
+        if payload_format == 'xml':
+            parsed = parse_xml_records(response.raw, source_config)
+        elif payload_format == 'csv':
+            lines = io.TextIOWrapper(response.raw, encoding='utf-8-sig', newline='')
+            parsed = parse_csv_records(lines, source_config)
+        else:
+            raise ValueError(f"Unsupported bulk format '{payload_format}' for {source_config['bulkUrl']}")
+        
+        for record in parsed:
+            check_deadline(deadline)
+            yield record
+
+def scrape_http(source_config, start_date, end_date, max_pages, validators=None, deadline=None):
+    """
+    Scrape a source without a browser
+    
+    Returns the scraped records, or None when the page has no matching
+    entries in its static HTML or its pager is script-driven (i.e. it needs
+    JavaScript and Selenium).
+    The first request is conditional when a validator cache is given.
+    Raises DeadlineExceeded before a page once the run deadline has passed.
+    """
+    url = source_config['url']
+    records = []
+    
+    for page in range(1, max_pages + 1):
+        check_deadline(deadline)
+        response = conditional_get(url, validators if page == 1 else None)
+        response.raise_for_status()
+        payload_format = detect_format(source_config, response)
+        
+        if payload_format == 'xml':
+            parsed = parse_xml_records(response.content, source_config)
+            return [r for r in parsed if in_date_range(r, start_date, end_date)]
+        
+        if payload_format == 'csv':
+            parsed = parse_csv_records(io.StringIO(response.text), source_config)
+            return [r for r in parsed if in_date_range(r, start_date, end_date)]
+        
+        page_records, entry_count, has_next, next_url = parse_sanctions_html(
+            response.text, source_config, start_date, end_date
+        )
+        
+        if page == 1 and entry_count == 0:
+            return None
+        
+        records.extend(page_records)
+        
+        if not has_next:
+            break
+        if not next_url:
+            # Later pages are only reachable by clicking; don't return a partial list
+            print(f"Next page of {source_config['url']} has no link")
+            return None
+        
+        # Later pages can change while the first one doesn't
+        if validators is not None:
+            validators.discard(source_config['url'])
+        url = urljoin(url, next_url)
+    
+    return records
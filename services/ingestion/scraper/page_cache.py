@@ -0,0 +1,104 @@
+"""
+Persistent HTTP validator cache for conditional requests
+
+Stores the ETag / Last-Modified validators of each source URL in the raw
+bucket (outside the raw/ prefix) so the next run can send a conditional GET.
+A 304 Not Modified means the source hasn't changed since the last successful
+run and the whole scrape can be skipped.
+
+Validators are only persisted once the run that fetched them has uploaded
+its output, so a failed upload is retried in full next time.
+
+A 304 only proves that the records the earlier run extracted are still
+complete, so each entry records the start of that run's date range. A run
+reaching further back (a full or backfill run after an incremental one)
+fetches unconditionally.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+class NotModified(Exception):
+    """
+    The source answered 304 to a conditional request
+    """
+
+class ValidatorCache:
+    """
+    Validators for the URLs fetched by one source run, which extracts
+    records dated from range_start on
+    """
+    
+    def __init__(self, s3_client, bucket, range_start, prefix='state/http-cache'):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.range_start = range_start
+        self.prefix = prefix
+        self.pending = {}
+    
+    def _key(self, url):
+        return f"{self.prefix}/{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+    
+    def headers_for(self, url):
+        """
+        Conditional request headers for url, empty if it was never cached or
+        the cached run didn't reach back to range_start
+        """
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=self._key(url))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                raise
+            return {}
+        
+        entry = json.loads(response['Body'].read())
+        if not entry.get('rangeStart') or datetime.fromisoformat(entry['rangeStart']) > self.range_start:
+            return {}
+        
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+        return headers
+    
+    def check(self, url, response):
+        """
+        Raise NotModified on a 304, otherwise remember the response's validators
+        """
+        if response.status_code == 304:
+            raise NotModified(url)
+        
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.ok and (etag or last_modified):
+            self.pending[url] = {
+                'url': url,
+                'etag': etag,
+                'lastModified': last_modified,
+                'rangeStart': self.range_start.isoformat(),
+                'fetchedAt': datetime.utcnow().isoformat()
+            }
+    
+    def discard(self, url):
+        """
+        Don't persist validators for url (e.g. its content spans further pages)
+        """
+        self.pending.pop(url, None)
+    
+    def commit(self):
+        """
+        Persist validators after the run's output was uploaded
+        """
+        for url, entry in self.pending.items():
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=self._key(url),
+                Body=json.dumps(entry).encode('utf-8'),
+                ContentType='application/json',
+                ServerSideEncryption='aws:kms'
+            )
+        self.pending = {}
@@ -0,0 +1,146 @@
+"""
+Adaptive per-domain rate limiting
+
+Each domain gets a token bucket whose refill rate follows the server:
+fast, healthy responses raise it step by step, slow responses lower it, and
+429/503 halve it (AIMD). A Retry-After header pauses the domain for as long
+as the server asks. Sources therefore run as fast as their hosts allow
+instead of at a fixed delay per page.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+THROTTLE_STATUSES = {429, 503}
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class TokenBucket:
+    """
+    Token bucket with an adjustable rate (requests per second)
+    """
+    
+    def __init__(self, rate, burst, min_rate, max_rate):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+    
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def acquire(self):
+        """
+        Block until a request may be sent
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+    
+    def slow_down(self, factor):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate * factor)
+            self.tokens = min(self.tokens, 1.0)
+    
+    def speed_up(self, step):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + step)
+    
+    def pause(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+class AdaptiveRateLimiter:
+    """
+    One adaptive token bucket per domain
+    """
+    
+    def __init__(self, initial_rate=1.0, min_rate=0.1, max_rate=10.0, burst=2.0,
+                 target_latency=2.0, increase_step=0.25, decrease_factor=0.5):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.target_latency = target_latency
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.buckets = {}
+        self.lock = threading.Lock()
+    
+    def bucket(self, url):
+        domain = urlparse(url).netloc.lower()
+        with self.lock:
+            if domain not in self.buckets:
+                self.buckets[domain] = TokenBucket(self.initial_rate, self.burst, self.min_rate, self.max_rate)
+            return self.buckets[domain]
+    
+    def acquire(self, url):
+        """
+        Wait for the domain's next request slot
+        """
+        self.bucket(url).acquire()
+    
+    def record(self, url, latency, status=None, retry_after=None):
+        """
+        Adapt the domain's rate to one observed response
+        
+        status is None for browser navigations, where only latency is known.
+        """
+        bucket = self.bucket(url)
+        
+        if status in THROTTLE_STATUSES:
+            bucket.slow_down(self.decrease_factor)
+            delay = parse_retry_after(retry_after)
+            if delay:
+                bucket.pause(delay)
+        elif latency > self.target_latency:
+            # Server is struggling; back off gently before it starts refusing
+            bucket.slow_down(0.8)
+        else:
+            bucket.speed_up(self.increase_step)
+    
+    def rate(self, url):
+        return self.bucket(url).rate
+
+# Shared by every fetch in the task, so all sources on a host see the same budget
+rate_limiter = AdaptiveRateLimiter(
+    initial_rate=float(os.environ.get('RATE_INITIAL_RPS', '1.0')),
+    min_rate=float(os.environ.get('RATE_MIN_RPS', '0.1')),
+    max_rate=float(os.environ.get('RATE_MAX_RPS', '10.0')),
+    target_latency=float(os.environ.get('RATE_TARGET_LATENCY_SECONDS', '2.0'))
+)
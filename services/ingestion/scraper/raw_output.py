@@ -0,0 +1,174 @@
+"""
+Chunked, gzip-compressed NDJSON output for raw scrapes
+
+Records are written one JSON object per line. Every `records_per_chunk`
+records form one gzip member; members are concatenated into a single S3
+object through a multipart upload as they are produced, so neither the
+scraper nor downstream readers ever hold a whole scrape in memory. A
+concatenation of gzip members is itself a valid gzip stream, and each chunk
+can also be fetched and decompressed on its own with a ranged GET.
+
+A small manifest describes the object: record counts plus the byte offset,
+length and SHA-256 of every chunk.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+from datetime import datetime
+
+# S3 multipart parts must be at least 5 MiB (except the last one)
+MIN_PART_BYTES = 5 * 1024 * 1024
+
+def manifest_key_for(key):
+    """
+    Manifests live under manifests/ so they don't trigger the NLP pipeline
+    """
+    return f"manifests/{key}.manifest.json"
+
+class ChunkedNdjsonWriter:
+    """
+    Streams records into one .ndjson.gz object via multipart upload and
+    writes its manifest on close
+    """
+    
+    def __init__(self, s3_client, bucket, key, records_per_chunk=5000, metadata=None):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.records_per_chunk = records_per_chunk
+        self.metadata = metadata or {}
+        self.lines = []
+        self.part_buffer = io.BytesIO()
+        self.parts = []
+        self.upload_id = None
+        self.chunks = []
+        self.offset = 0
+        self.record_count = 0
+        self.object_hash = hashlib.sha256()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+    
+    def write(self, record):
+        """
+        Append one record; a full chunk is compressed and queued for upload
+        """
+        self.lines.append(json.dumps(record, separators=(',', ':')).encode('utf-8'))
+        self.record_count += 1
+        
+        if len(self.lines) >= self.records_per_chunk:
+            self._finish_chunk()
+    
+    def close(self):
+        """
+        Upload any remaining data, complete the object and write the manifest
+        Returns the manifest
+        """
+        if self.lines:
+            self._finish_chunk()
+        
+        if self.upload_id is None:
+            # Small output: a single put is cheaper than a one-part multipart upload
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=self.part_buffer.getvalue(),
+                ContentType='application/x-ndjson',
+                ServerSideEncryption='aws:kms',
+                Metadata={**self._object_metadata(), 'record-count': str(self.record_count)}
+            )
+        else:
+            if self.part_buffer.tell():
+                self._upload_part()
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': self.parts}
+            )
+        
+        manifest = {
+            **self.metadata,
+            'key': self.key,
+            'format': 'ndjson+gzip',
+            'recordCount': self.record_count,
+            'byteCount': self.offset,
+            'sha256': self.object_hash.hexdigest(),
+            'chunks': self.chunks,
+            'createdAt': datetime.utcnow().isoformat()
+        }
+        
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=manifest_key_for(self.key),
+            Body=json.dumps(manifest).encode('utf-8'),
+            ContentType='application/json',
+            ServerSideEncryption='aws:kms'
+        )
+        
+        print(f"Wrote s3://{self.bucket}/{self.key}: {self.record_count} records, "
+              f"{len(self.chunks)} chunks, {self.offset} bytes")
+        return manifest
+    
+    def abort(self):
+        """
+        Discard an in-progress multipart upload
+        """
+        if self.upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            self.upload_id = None
+    
+    def _object_metadata(self):
+        # Only flat string/int fields fit in S3 object metadata
+        return {k: str(v) for k, v in self.metadata.items() if isinstance(v, (str, int))}
+    
+    def _finish_chunk(self):
+        data = gzip.compress(b'\n'.join(self.lines) + b'\n')
+        
+        self.chunks.append({
+            'index': len(self.chunks),
+            'firstRecord': self.record_count - len(self.lines),
+            'recordCount': len(self.lines),
+            'offset': self.offset,
+            'length': len(data),
+            'sha256': hashlib.sha256(data).hexdigest()
+        })
+        
+        self.lines = []
+        self.offset += len(data)
+        self.object_hash.update(data)
+        self.part_buffer.write(data)
+        
+        if self.part_buffer.tell() >= MIN_PART_BYTES:
+            self._upload_part()
+    
+    def _upload_part(self):
+        if self.upload_id is None:
+            response = self.s3.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                ContentType='application/x-ndjson',
+                ServerSideEncryption='aws:kms',
+                Metadata=self._object_metadata()
+            )
+            self.upload_id = response['UploadId']
+        
+        part_number = len(self.parts) + 1
+        response = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=self.part_buffer.getvalue()
+        )
+        
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.part_buffer = io.BytesIO()
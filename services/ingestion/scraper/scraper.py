@@ -7,8 +7,17 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import ThreadPoolExecutor, wait
+import random
 import time
 
+from driver_pool import DomainLimiter, DriverPool
+from fingerprints import FingerprintStore
+from http_fetch import DeadlineExceeded, choose_engine, probe, scrape_http, stream_bulk_records
+from page_cache import NotModified, ValidatorCache
+from rate_limiter import parse_retry_after, rate_limiter
+from raw_output import ChunkedNdjsonWriter
+
 s3 = boto3.client('s3')
 RAW_BUCKET = os.environ['RAW_BUCKET']
 
@@ -17,8 +26,19 @@ SCRAPE_MODE = os.environ.get('SCRAPE_MODE', 'incremental')  # 'full', 'increment
 LOOKBACK_DAYS = int(os.environ.get('LOOKBACK_DAYS', '7'))  # Default: 1 week
 MAX_PAGES = int(os.environ.get('MAX_PAGES', '100'))  # Pagination limit
 RETRY_ATTEMPTS = int(os.environ.get('RETRY_ATTEMPTS', '3'))
+RETRY_BASE_DELAY = float(os.environ.get('RETRY_BASE_DELAY_SECONDS', '1.0'))
+RETRY_MAX_DELAY = float(os.environ.get('RETRY_MAX_DELAY_SECONDS', '60.0'))
+PAGE_LOAD_TIMEOUT = 10  # Seconds to wait for a page or next page to render
 PROXY_ROTATION = os.environ.get('PROXY_ROTATION', 'false').lower() == 'true'
 
+# Worker-pool configuration
+SCRAPER_WORKERS = int(os.environ.get('SCRAPER_WORKERS', '5'))  # Sources scraped concurrently (and pooled drivers)
+MAX_PER_DOMAIN = int(os.environ.get('MAX_PER_DOMAIN', '1'))  # Concurrent sources per host
+RUN_DEADLINE_SECONDS = int(os.environ.get('RUN_DEADLINE_SECONDS', '3300'))  # Overall run budget
+CHUNK_RECORDS = int(os.environ.get('CHUNK_RECORDS', '5000'))  # Records per gzip chunk in raw output
+CHANGE_DETECTION = os.environ.get('CHANGE_DETECTION', 'true').lower() == 'true'  # Upload only added/changed/removed records
+CONDITIONAL_REQUESTS = os.environ.get('CONDITIONAL_REQUESTS', 'true').lower() == 'true'  # Skip sources answering 304
+
 def get_chrome_driver(use_proxy=False):
     """
     Initialize Chrome driver with security and performance options
@@ -62,7 +82,7 @@ def calculate_date_range():
     
     return start_date, end_date
 
-def scrape_source(source_config, start_date, end_date):
+def scrape_source(source_config, start_date, end_date, driver_pool=None, validators=None, deadline=None):
     """
     Scrape data from external source with date range and pagination
     
@@ -70,52 +90,94 @@ def scrape_source(source_config, start_date, end_date):
         source_config: Dict with 'url', 'type', 'selectors'
         start_date: Start of date range
         end_date: End of date range
+        driver_pool: Optional DriverPool to borrow a driver from; without
+            one a dedicated driver is launched and quit afterwards
+        validators: Optional ValidatorCache; raises NotModified when the
+            source answers 304 to a conditional request
+        deadline: Optional time.monotonic() deadline; HTTP scrapes raise
+            DeadlineExceeded between pages once it has passed
+    
+    Static and structured sources are fetched over plain HTTP first; Chrome
+    is only started for JS-rendered pages.
     """
-    source_url = source_config['url']
-    source_type = source_config.get('type', 'generic')
+    if choose_engine(source_config) == 'http':
+        print(f"Fetching {source_config['url']} over HTTP")
+        scraped_records = scrape_http(source_config, start_date, end_date, MAX_PAGES, validators=validators, deadline=deadline)
+        
+        if scraped_records is not None:
+            print(f"Scraped {len(scraped_records)} records from {source_config['url']}")
+            return build_result(source_config, start_date, end_date, scraped_records, 'http')
+        
+        print(f"No entries in static HTML for {source_config['url']}, falling back to Selenium")
+        if validators is not None:
+            validators.discard(source_config['url'])
+    elif validators is not None and source_config.get('conditional'):
+        # Rendered pages are usually dynamic, so browser sources opt in explicitly
+        probe(source_config['url'], validators)
+    
+    if driver_pool is not None:
+        with driver_pool.driver() as driver:
+            return scrape_with_driver(driver, source_config, start_date, end_date)
     
     driver = get_chrome_driver(use_proxy=PROXY_ROTATION)
-    scraped_records = []
     
     try:
-        print(f"Scraping {source_url} ({source_type})")
-        
-        # Navigate to source
-        driver.get(source_url)
-        
-        # Wait for page load
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        
-        # Source-specific scraping logic
-        if source_type == 'sanctions_list':
-            scraped_records = scrape_sanctions_list(driver, source_config, start_date, end_date)
-        elif source_type == 'pep_database':
-            scraped_records = scrape_pep_database(driver, source_config, start_date, end_date)
-        elif source_type == 'adverse_media':
-            scraped_records = scrape_adverse_media(driver, source_config, start_date, end_date)
-        else:
-            # Generic scraping
-            scraped_records = scrape_generic(driver, source_config, start_date, end_date)
-        
-        print(f"Scraped {len(scraped_records)} records from {source_url}")
-        
-        return {
-            'source': source_url,
-            'sourceType': source_type,
-            'scrapedAt': datetime.utcnow().isoformat(),
-            'dateRange': {
-                'start': start_date.isoformat(),
-                'end': end_date.isoformat()
-            },
-            'recordCount': len(scraped_records),
-            'records': scraped_records
-        }
-        
+        return scrape_with_driver(driver, source_config, start_date, end_date)
     finally:
         driver.quit()
 
+def scrape_with_driver(driver, source_config, start_date, end_date):
+    """
+    Run the source-specific scraping logic on an already running driver
+    """
+    source_url = source_config['url']
+    source_type = source_config.get('type', 'generic')
+    
+    print(f"Scraping {source_url} ({source_type})")
+    
+    # Navigate to source
+    rate_limiter.acquire(source_url)
+    started = time.monotonic()
+    driver.get(source_url)
+    
+    # Wait for page load
+    WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(
+        EC.presence_of_element_located((By.TAG_NAME, "body"))
+    )
+    rate_limiter.record(source_url, time.monotonic() - started)
+    
+    # Source-specific scraping logic
+    if source_type == 'sanctions_list':
+        scraped_records = scrape_sanctions_list(driver, source_config, start_date, end_date)
+    elif source_type == 'pep_database':
+        scraped_records = scrape_pep_database(driver, source_config, start_date, end_date)
+    elif source_type == 'adverse_media':
+        scraped_records = scrape_adverse_media(driver, source_config, start_date, end_date)
+    else:
+        # Generic scraping
+        scraped_records = scrape_generic(driver, source_config, start_date, end_date)
+    
+    print(f"Scraped {len(scraped_records)} records from {source_url}")
+    
+    return build_result(source_config, start_date, end_date, scraped_records, 'browser')
+
+def build_result(source_config, start_date, end_date, scraped_records, fetch_engine):
+    """
+    Wrap scraped records in the raw output envelope
+    """
+    return {
+        'source': source_config['url'],
+        'sourceType': source_config.get('type', 'generic'),
+        'fetchEngine': fetch_engine,
+        'scrapedAt': datetime.utcnow().isoformat(),
+        'dateRange': {
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat()
+        },
+        'recordCount': len(scraped_records),
+        'records': scraped_records
+    }
+
 def scrape_sanctions_list(driver, config, start_date, end_date):
     """
     Scrape sanctions lists (OFAC, UN, EU, etc.)
@@ -158,12 +220,24 @@ def scrape_sanctions_list(driver, config, start_date, end_date):
                 next_button = driver.find_element(By.CSS_SELECTOR, config.get('next_button', '.next-page'))
                 if not next_button.is_enabled():
                     break
+                
+                # Pace clicks by the domain's adaptive rate instead of a fixed sleep
+                rate_limiter.acquire(config['url'])
+                marker = entries[0] if entries else driver.find_element(By.TAG_NAME, 'body')
+                started = time.monotonic()
                 next_button.click()
-                time.sleep(2)  # Rate limiting
                 page += 1
             except:
                 break  # No more pages
-                
+            
+            # The next page is loaded once the old entries are gone; a slow
+            # render lowers the domain's rate
+            try:
+                WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(EC.staleness_of(marker))
+            except Exception:
+                print(f"Page {page} still loading after {PAGE_LOAD_TIMEOUT}s")
+            rate_limiter.record(config['url'], time.monotonic() - started)
+            
         except Exception as e:
             print(f"Error on page {page}: {str(e)}")
             break
@@ -229,33 +303,174 @@ def scrape_generic(driver, config, start_date, end_date):
     
     return records
 
+def raw_key(source_name):
+    """
+    Raw output key, partitioned by date
+    """
+    timestamp = datetime.utcnow()
+    return f"raw/{timestamp.strftime('%Y/%m/%d')}/{source_name}_{timestamp.strftime('%H%M%S')}.ndjson.gz"
+
+def write_records(records, source_name, envelope, complete=False):
+    """
+    Write records to S3 as chunked gzip NDJSON (multipart upload) plus a manifest
+    The envelope fields (source, scrapedAt, dateRange, ...) go into the manifest
+    
+    With CHANGE_DETECTION on, only the delta against the previous run's
+    fingerprints is written; complete=True means the records cover the whole
+    source, so missing ones are reported as removed. Nothing is uploaded when
+    nothing changed. Returns (key or None, records written).
+    """
+    key = raw_key(source_name)
+    fingerprints = None
+    metadata = {**envelope, 'sourceName': source_name, 'scrapeMode': SCRAPE_MODE}
+    
+    if CHANGE_DETECTION:
+        fingerprints = FingerprintStore(s3, RAW_BUCKET, source_name).load()
+        records = fingerprints.diff(records, complete=complete)
+        metadata['delta'] = True
+    
+    writer = ChunkedNdjsonWriter(s3, RAW_BUCKET, key, records_per_chunk=CHUNK_RECORDS, metadata=metadata)
+    
+    try:
+        for record in records:
+            writer.write(record)
+    except Exception:
+        writer.abort()
+        raise
+    
+    if fingerprints is not None:
+        print(f"Changes for {source_name}: {fingerprints.counts}")
+        writer.metadata['changes'] = fingerprints.counts
+    
+    if writer.record_count:
+        writer.close()
+    else:
+        writer.abort()
+        key = None
+    
+    # Only remember what was seen once the delta is safely stored
+    if fingerprints is not None:
+        fingerprints.save(complete=complete)
+    
+    return key, writer.record_count
+
 def upload_to_s3(data, source_name):
     """
     Upload scraped data to S3 with partitioning by date
     """
-    timestamp = datetime.utcnow()
-    key = f"raw/{timestamp.strftime('%Y/%m/%d')}/{source_name}_{timestamp.strftime('%H%M%S')}.json"
-    
-    s3.put_object(
-        Bucket=RAW_BUCKET,
-        Key=key,
-        Body=json.dumps(data, indent=2).encode('utf-8'),
-        ContentType='application/json',
-        ServerSideEncryption='aws:kms',
-        Metadata={
-            'source': source_name,
-            'scrape-mode': SCRAPE_MODE,
-            'record-count': str(data['recordCount'])
-        }
-    )
+    envelope = {k: v for k, v in data.items() if k not in ('records', 'recordCount')}
+    key, record_count = write_records(data['records'], source_name, envelope)
     
-    print(f"Uploaded to s3://{RAW_BUCKET}/{key}")
+    if key:
+        print(f"Uploaded {record_count} records to s3://{RAW_BUCKET}/{key}")
+    else:
+        print(f"No changes for {source_name}, nothing uploaded")
     return key
 
+def stream_bulk_to_s3(source_config, source_name, validators=None, deadline=None):
+    """
+    Full mode for sources with an official bulk export ('bulkUrl')
+    Streams the XML/CSV download through the parser straight into the chunked
+    writer, so memory stays flat regardless of list size
+    """
+    print(f"Streaming bulk export {source_config['bulkUrl']}")
+    
+    envelope = {
+        'source': source_config['bulkUrl'],
+        'sourceType': source_config.get('type', 'generic'),
+        'fetchEngine': 'http-bulk',
+        'scrapedAt': datetime.utcnow().isoformat()
+    }
+    # A bulk export is the whole list, so entries missing from it were removed
+    key, record_count = write_records(stream_bulk_records(source_config, validators, deadline), source_name, envelope, complete=True)
+    
+    if key:
+        print(f"Streamed {record_count} records to s3://{RAW_BUCKET}/{key}")
+    else:
+        print(f"No changes for {source_name}, nothing uploaded")
+    return record_count
+
+def retry_delay(error, attempt):
+    """
+    Full-jitter exponential backoff, but never shorter than the server's Retry-After
+    """
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+    
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    retry_after = parse_retry_after(headers.get('Retry-After'))
+    
+    return max(delay, retry_after or 0)
+
+def scrape_with_retries(source_config, start_date, end_date, driver_pool, domain_limiter, deadline):
+    """
+    Scrape and upload one source, retrying with backoff until RETRY_ATTEMPTS or the run deadline
+    Returns True on success
+    """
+    source_name = source_config.get('name', 'unknown')
+    
+    for attempt in range(RETRY_ATTEMPTS):
+        if time.monotonic() >= deadline:
+            print(f"✗ Run deadline reached before scraping {source_name}")
+            return False
+        
+        try:
+            print(f"\n{'='*60}")
+            print(f"Source: {source_name} (Attempt {attempt + 1}/{RETRY_ATTEMPTS})")
+            print(f"{'='*60}")
+            
+            validators = None
+            if CONDITIONAL_REQUESTS and source_config.get('conditional', True):
+                validators = ValidatorCache(s3, RAW_BUCKET, start_date)
+            
+            if SCRAPE_MODE == 'full' and source_config.get('bulkUrl'):
+                with domain_limiter.limit(source_config['bulkUrl']):
+                    record_count = stream_bulk_to_s3(source_config, source_name, validators, deadline)
+                
+                if validators is not None:
+                    validators.commit()
+                print(f"✓ Successfully streamed {source_name}: {record_count} records")
+                return True
+            
+            with domain_limiter.limit(source_config['url']):
+                data = scrape_source(source_config, start_date, end_date, driver_pool=driver_pool,
+                                     validators=validators, deadline=deadline)
+            
+            # Upload to S3
+            upload_to_s3(data, source_name)
+            
+            # Validators are only saved once the output is safely stored
+            if validators is not None:
+                validators.commit()
+            
+            print(f"✓ Successfully scraped {source_name}: {data['recordCount']} records")
+            return True
+            
+        except NotModified:
+            print(f"✓ {source_name} not modified since the last run, skipping")
+            return True
+            
+        except DeadlineExceeded:
+            print(f"✗ Run deadline reached while scraping {source_name}, abandoning it")
+            return False
+            
+        except Exception as e:
+            print(f"✗ Error scraping {source_name} (attempt {attempt + 1}): {str(e)}")
+            
+            if attempt < RETRY_ATTEMPTS - 1:
+                wait_time = min(retry_delay(e, attempt), max(0, deadline - time.monotonic()))
+                print(f"Retrying in {wait_time:.1f} seconds...")
+                time.sleep(wait_time)
+            else:
+                print(f"Failed to scrape {source_name} after {RETRY_ATTEMPTS} attempts")
+    
+    return False
+
 def main():
     """
     Main scraper task - runs in Fargate
     Supports multiple scraping modes and date ranges
+    Sources are scraped concurrently by SCRAPER_WORKERS threads sharing a pool of drivers
     """
     # Parse source configurations
     sources_json = os.environ.get('SOURCES_CONFIG', '[]')
@@ -267,34 +482,35 @@ def main():
     
     # Calculate date range based on mode
     start_date, end_date = calculate_date_range()
+    deadline = time.monotonic() + RUN_DEADLINE_SECONDS
+    
+    driver_pool = DriverPool(SCRAPER_WORKERS, lambda: get_chrome_driver(use_proxy=PROXY_ROTATION))
+    domain_limiter = DomainLimiter(MAX_PER_DOMAIN)
+    executor = ThreadPoolExecutor(max_workers=SCRAPER_WORKERS)
     
-    # Scrape each source
-    for source_config in sources:
-        source_name = source_config.get('name', 'unknown')
+    try:
+        # Scrape sources in parallel
+        futures = {
+            executor.submit(scrape_with_retries, source_config, start_date, end_date,
+                            driver_pool, domain_limiter, deadline): source_config.get('name', 'unknown')
+            for source_config in sources
+        }
         
-        for attempt in range(RETRY_ATTEMPTS):
-            try:
-                print(f"\n{'='*60}")
-                print(f"Source: {source_name} (Attempt {attempt + 1}/{RETRY_ATTEMPTS})")
-                print(f"{'='*60}")
-                
-                data = scrape_source(source_config, start_date, end_date)
-                
-                # Upload to S3
-                s3_key = upload_to_s3(data, source_name)
-                
-                print(f"✓ Successfully scraped {source_name}: {data['recordCount']} records")
-                break  # Success, move to next source
-                
-            except Exception as e:
-                print(f"✗ Error scraping {source_name} (attempt {attempt + 1}): {str(e)}")
-                
-                if attempt < RETRY_ATTEMPTS - 1:
-                    wait_time = 2 ** attempt  # Exponential backoff
-                    print(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    print(f"Failed to scrape {source_name} after {RETRY_ATTEMPTS} attempts")
+        done, not_done = wait(futures, timeout=max(0, deadline - time.monotonic()))
+        
+        succeeded = [futures[f] for f in done if not f.exception() and f.result()]
+        failed = [futures[f] for f in done if f.exception() or not f.result()]
+        timed_out = [futures[f] for f in not_done]
+        
+        print(f"\nRun complete: {len(succeeded)} succeeded, {len(failed)} failed, {len(timed_out)} timed out")
+        if timed_out:
+            print(f"Deadline of {RUN_DEADLINE_SECONDS}s reached, abandoning: {', '.join(timed_out)}")
+        
+    finally:
+        # Quitting the drivers aborts browser scrapes still running past the
+        # deadline; HTTP and bulk scrapes stop at their next deadline check
+        executor.shutdown(wait=False, cancel_futures=True)
+        driver_pool.close()
 
 if __name__ == '__main__':
     main()
@@ -1,14 +1,47 @@
 import json
 import os
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from resolution_cache import ResolutionCache, resolution_key
+
+# Resolution concurrency and cache configuration
+RESOLUTION_CONCURRENCY = int(os.environ.get('RESOLUTION_CONCURRENCY', '8'))
+CACHE_MAX_SIZE = int(os.environ.get('RESOLUTION_CACHE_SIZE', '10000'))
+CACHE_TTL_SECONDS = int(os.environ.get('RESOLUTION_CACHE_TTL_SECONDS', '3600'))
+
 s3 = boto3.client('s3')
-sagemaker_runtime = boto3.client('sagemaker-runtime')
+sagemaker_runtime = boto3.client(
+    'sagemaker-runtime',
+    config=Config(max_pool_connections=RESOLUTION_CONCURRENCY)
+)
 
 SAGEMAKER_ENDPOINT = os.environ['SAGEMAKER_ENDPOINT']
 PROCESSED_BUCKET = os.environ['PROCESSED_BUCKET']
 
+# Survives across invocations in a warm container
+resolution_cache = ResolutionCache(max_size=CACHE_MAX_SIZE, ttl_seconds=CACHE_TTL_SECONDS)
+
+def resolve_with_sagemaker(text, entity_type, context):
+    """
+    Use SageMaker for contextual disambiguation of one entity mention
+    This reduces false positives by considering context
+    """
+    sagemaker_response = sagemaker_runtime.invoke_endpoint(
+        EndpointName=SAGEMAKER_ENDPOINT,
+        ContentType='application/json',
+        Body=json.dumps({
+            'entity': text,
+            'type': entity_type,
+            'context': context,
+            'task': 'entity_resolution'
+        })
+    )
+    
+    return json.loads(sagemaker_response['Body'].read().decode('utf-8'))
+
 def handler(event, context):
     """
     Entity Resolution & Disambiguation using SageMaker
@@ -23,27 +56,43 @@ def handler(event, context):
         
         print(f"Resolving {len(entities)} entities from {key}")
         
-        # Download NER output for context
-        response = s3.get_object(Bucket=bucket, Key=key)
-        ner_data = json.loads(response['Body'].read().decode('utf-8'))
+        # NER passes the raw source key along; only older payloads need the
+        # NER output downloaded to find it
+        source_key = event.get('sourceKey')
+        if source_key is None:
+            response = s3.get_object(Bucket=bucket, Key=key)
+            source_key = json.loads(response['Body'].read().decode('utf-8'))['sourceKey']
         
         resolved_entities = []
         
+        # Dedupe mentions and serve repeats from the cache
+        results = {}
+        pending = {}
         for entity in entities:
-            # Use SageMaker for contextual disambiguation
-            # This reduces false positives by considering context
-            sagemaker_response = sagemaker_runtime.invoke_endpoint(
-                EndpointName=SAGEMAKER_ENDPOINT,
-                ContentType='application/json',
-                Body=json.dumps({
-                    'entity': entity['text'],
-                    'type': entity['type'],
-                    'context': ner_data.get('sourceKey', ''),
-                    'task': 'entity_resolution'
-                })
-            )
-            
-            result = json.loads(sagemaker_response['Body'].read().decode('utf-8'))
+            mention_key = resolution_key(entity['text'], entity['type'])
+            if mention_key in results or mention_key in pending:
+                continue
+            cached = resolution_cache.get(mention_key)
+            if cached is not None:
+                results[mention_key] = cached
+            else:
+                pending[mention_key] = entity
+        
+        # Resolve the remaining unique mentions concurrently
+        def resolve(item):
+            mention_key, entity = item
+            return mention_key, resolve_with_sagemaker(entity['text'], entity['type'], source_key)
+        
+        with ThreadPoolExecutor(max_workers=RESOLUTION_CONCURRENCY) as executor:
+            for mention_key, result in executor.map(resolve, pending.items()):
+                resolution_cache.put(mention_key, result)
+                results[mention_key] = result
+        
+        print(f"Resolved {len(results)} unique entities: {len(pending)} via SageMaker, "
+              f"{len(results) - len(pending)} from cache")
+        
+        for entity in entities:
+            result = results[resolution_key(entity['text'], entity['type'])]
             
             # Canonical entity with disambiguation score
             resolved_entities.append({
@@ -59,7 +108,7 @@ def handler(event, context):
         # Write resolved entities
         output_key = key.replace('ner/', 'resolved/')
         output_data = {
-            'sourceKey': ner_data['sourceKey'],
+            'sourceKey': source_key,
             'resolvedEntities': resolved_entities,
             'processedAt': datetime.utcnow().isoformat(),
             'stage': 'entity_resolution',
@@ -67,6 +116,11 @@ def handler(event, context):
                 'originalCount': len(entities),
                 'resolvedCount': len(resolved_entities),
                 'avgDisambiguationScore': sum(e['disambiguationScore'] for e in resolved_entities) / len(resolved_entities) if resolved_entities else 0
+            },
+            'resolutionStats': {
+                'uniqueEntities': len(results),
+                'inferenceCalls': len(pending),
+                'cacheHits': len(results) - len(pending)
             }
         }
         
@@ -0,0 +1,58 @@
+"""
+Canonical-ID cache for entity resolution
+
+Lives at module level so it survives across invocations in a warm Lambda
+container. Entries expire after a TTL and the least recently used entry is
+evicted once the cache is full.
+"""
+
+import re
+import time
+from collections import OrderedDict
+
+def resolution_key(text, entity_type):
+    """
+    Cache key for an entity mention: whitespace/case-normalized text plus type
+    """
+    return (re.sub(r'\s+', ' ', text).strip().lower(), entity_type)
+
+class ResolutionCache:
+    """
+    LRU cache with per-entry TTL
+    """
+    
+    def __init__(self, max_size=10000, ttl_seconds=3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def get(self, key):
+        """
+        Cached value for key, or None if missing or expired
+        """
+        entry = self.entries.get(key)
+        
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entry when full
+        """
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
@@ -3,16 +3,111 @@ NER using AWS Comprehend (no SageMaker needed!)
 Cost: $0.0001 per unit (100 characters)
 """
 
+import gzip
 import json
 import os
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# BatchDetectEntities accepts up to 25 documents of 5,000 bytes each
+BATCH_SIZE = 25
+MAX_DOCUMENT_BYTES = 5000
+COMPREHEND_CONCURRENCY = int(os.environ.get('COMPREHEND_CONCURRENCY', '4'))
+
 s3 = boto3.client('s3')
-comprehend = boto3.client('comprehend')
+# Adaptive retries add client-side rate limiting when Comprehend throttles
+comprehend = boto3.client(
+    'comprehend',
+    config=Config(
+        max_pool_connections=COMPREHEND_CONCURRENCY,
+        retries={'mode': 'adaptive', 'max_attempts': 10}
+    )
+)
 
 PROCESSED_BUCKET = os.environ['PROCESSED_BUCKET']
 
+def truncate_utf8(text, max_bytes=MAX_DOCUMENT_BYTES):
+    """
+    Trim text to a UTF-8 byte budget without splitting a character
+    """
+    return text.encode('utf-8')[:max_bytes].decode('utf-8', 'ignore')
+
+def to_entities(record_index, comprehend_entities):
+    """
+    Convert Comprehend entities to our format
+    Offsets are relative to the text of the source record
+    """
+    return [
+        {
+            'text': entity['Text'],
+            'type': entity['Type'],  # PERSON, ORGANIZATION, LOCATION, etc.
+            'score': entity['Score'],
+            'start': entity['BeginOffset'],
+            'end': entity['EndOffset'],
+            'recordIndex': record_index
+        }
+        for entity in comprehend_entities
+    ]
+
+def detect_batch(batch):
+    """
+    Run BatchDetectEntities over up to 25 (record_index, text) pairs
+    
+    Returns (entities, errors). Documents Comprehend rejects are reported
+    individually; if the whole call fails, each document is retried alone
+    so one bad record cannot fail the file.
+    """
+    entities = []
+    errors = []
+    
+    try:
+        response = comprehend.batch_detect_entities(
+            TextList=[text for _, text in batch],
+            LanguageCode='en'
+        )
+    except Exception as e:
+        print(f"Batch of {len(batch)} failed ({str(e)}), retrying documents individually")
+        for record_index, text in batch:
+            try:
+                single = comprehend.detect_entities(Text=text, LanguageCode='en')
+                entities.extend(to_entities(record_index, single['Entities']))
+            except Exception as record_error:
+                errors.append({'recordIndex': record_index, 'error': str(record_error)})
+        return entities, errors
+    
+    # Result/Error indexes refer to positions within this batch
+    for result in response.get('ResultList', []):
+        record_index = batch[result['Index']][0]
+        entities.extend(to_entities(record_index, result['Entities']))
+    
+    for error in response.get('ErrorList', []):
+        errors.append({
+            'recordIndex': batch[error['Index']][0],
+            'error': f"{error.get('ErrorCode')}: {error.get('ErrorMessage')}"
+        })
+    
+    return entities, errors
+
+def iter_records(body, key):
+    """
+    Yield records from a raw object stream
+    .ndjson.gz / .ndjson hold one record per line and are read incrementally;
+    legacy .json files keep them under 'records'
+    """
+    if key.endswith('.ndjson.gz'):
+        lines = gzip.GzipFile(fileobj=body)
+    elif key.endswith('.ndjson'):
+        lines = body.iter_lines()
+    else:
+        yield from json.loads(body.read().decode('utf-8')).get('records', [])
+        return
+    
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
 def handler(event, context):
     """
     Named Entity Recognition using AWS Comprehend
@@ -24,44 +119,47 @@ def handler(event, context):
         
         print(f"Processing NER for s3://{bucket}/{key}")
         
-        # Download raw data
+        # Stream raw data; records are read one at a time
         response = s3.get_object(Bucket=bucket, Key=key)
-        raw_data = json.loads(response['Body'].read().decode('utf-8'))
         
         # Extract text from records
-        all_entities = []
+        documents = []
         
-        for record in raw_data.get('records', []):
+        for record_index, record in enumerate(iter_records(response['Body'], key)):
+            # Delta files list removed entries too; there is nothing new to extract
+            if record.get('changeType') == 'removed':
+                continue
+            
             # Combine all text fields
             text = f"{record.get('name', '')} {json.dumps(record.get('metadata', {}))}"
             
             if len(text) < 10:
                 continue
             
-            # Call AWS Comprehend for entity detection
-            comprehend_response = comprehend.detect_entities(
-                Text=text[:5000],  # Comprehend limit
-                LanguageCode='en'
-            )
-            
-            # Convert Comprehend entities to our format
-            for entity in comprehend_response['Entities']:
-                all_entities.append({
-                    'text': entity['Text'],
-                    'type': entity['Type'],  # PERSON, ORGANIZATION, LOCATION, etc.
-                    'score': entity['Score'],
-                    'start': entity['BeginOffset'],
-                    'end': entity['EndOffset']
-                })
+            documents.append((record_index, truncate_utf8(text)))  # Comprehend limit
+        
+        # Call AWS Comprehend in 25-document batches, several at a time
+        batches = [documents[i:i + BATCH_SIZE] for i in range(0, len(documents), BATCH_SIZE)]
+        all_entities = []
+        record_errors = []
+        
+        with ThreadPoolExecutor(max_workers=COMPREHEND_CONCURRENCY) as executor:
+            for entities, errors in executor.map(detect_batch, batches):
+                all_entities.extend(entities)
+                record_errors.extend(errors)
+        
+        for error in record_errors:
+            print(f"Skipping record {error['recordIndex']}: {error['error']}")
         
         # Write to processed bucket
-        output_key = f"ner/{key.replace('raw/', '')}"
+        output_key = f"ner/{key.replace('raw/', '').replace('.ndjson.gz', '.json')}"
         output_data = {
             'sourceKey': key,
             'entities': all_entities,
             'processedAt': datetime.utcnow().isoformat(),
             'stage': 'ner',
-            'engine': 'aws-comprehend'
+            'engine': 'aws-comprehend',
+            'recordErrors': record_errors
         }
         
         s3.put_object(
@@ -72,12 +170,14 @@ def handler(event, context):
             ServerSideEncryption='aws:kms'
         )
         
-        print(f"✓ NER complete: {len(all_entities)} entities extracted")
+        print(f"✓ NER complete: {len(all_entities)} entities extracted from {len(documents)} records "
+              f"in {len(batches)} batches ({len(record_errors)} records failed)")
         
         return {
             'statusCode': 200,
             'bucket': PROCESSED_BUCKET,
             'key': output_key,
+            'sourceKey': key,
             'entities': all_entities
         }
         
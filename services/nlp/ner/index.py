@@ -1,3 +1,4 @@
+import gzip
 import json
 import os
 import boto3
@@ -9,6 +10,23 @@ sagemaker_runtime = boto3.client('sagemaker-runtime')
 SAGEMAKER_ENDPOINT = os.environ['SAGEMAKER_ENDPOINT']
 PROCESSED_BUCKET = os.environ['PROCESSED_BUCKET']
 
+def read_text(body, key):
+    """
+    Text to run NER over: the 'content' of a legacy .json object, or the
+    content/name of each record in a chunked .ndjson.gz object, one per line
+    """
+    if not key.endswith('.ndjson.gz'):
+        return json.loads(body.read().decode('utf-8')).get('content', '')
+    
+    lines = []
+    for line in gzip.GzipFile(fileobj=body):
+        if line.strip():
+            record = json.loads(line)
+            if record.get('changeType') == 'removed':
+                continue
+            lines.append(record.get('content') or record.get('name', ''))
+    return '\n'.join(lines)
+
 def handler(event, context):
     """
     Named Entity Recognition using SageMaker
@@ -23,9 +41,7 @@ def handler(event, context):
         
         # Download raw data
         response = s3.get_object(Bucket=bucket, Key=key)
-        raw_data = json.loads(response['Body'].read().decode('utf-8'))
-        
-        text = raw_data.get('content', '')
+        text = read_text(response['Body'], key)
         
         # Invoke SageMaker endpoint for NER
         sagemaker_response = sagemaker_runtime.invoke_endpoint(
@@ -54,7 +70,7 @@ def handler(event, context):
             })
         
         # Write to processed bucket
-        output_key = f"ner/{key.replace('raw/', '')}"
+        output_key = f"ner/{key.replace('raw/', '').replace('.ndjson.gz', '.json')}"
         output_data = {
             'sourceKey': key,
             'entities': entities,
@@ -76,6 +92,7 @@ def handler(event, context):
             'statusCode': 200,
             'bucket': PROCESSED_BUCKET,
             'key': output_key,
+            'sourceKey': key,
             'entities': entities
         }
         
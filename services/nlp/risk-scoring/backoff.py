@@ -0,0 +1,33 @@
+"""
+Retry loop for partially failing batch calls
+
+BatchWriteItem and PutEvents both accept a batch and report back the
+entries they could not process; those are re-sent with full jitter
+exponential backoff until none are left.
+"""
+
+import random
+import time
+
+def send_with_retries(send, entries, max_retries, base_delay, max_delay, failure):
+    """
+    Call send(entries) until it returns no entries left to retry
+    
+    Returns the number of retries; raises once entries are still failing
+    after max_retries retries, with `failure` describing them.
+    """
+    attempt = 0
+    
+    while True:
+        entries = send(entries)
+        
+        if not entries:
+            return attempt
+        
+        if attempt >= max_retries:
+            raise RuntimeError(f"{len(entries)} {failure} after {max_retries} retries")
+        
+        # Full jitter backoff
+        delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+        attempt += 1
+        time.sleep(delay)
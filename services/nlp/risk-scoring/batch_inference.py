@@ -0,0 +1,111 @@
+"""
+Micro-batched SageMaker inference
+
+Packs many entity payloads into one endpoint request and splits the
+response back per entity, so a large sanctions file costs a few dozen
+HTTPS calls instead of one per entity.
+"""
+
+import json
+import time
+from botocore.exceptions import ClientError
+
+# SageMaker real-time endpoints reject request bodies over 6 MB
+MAX_PAYLOAD_BYTES = 5 * 1024 * 1024
+
+def is_payload_too_large(error):
+    """
+    True if a SageMaker error was caused by the request body size
+    """
+    if not isinstance(error, ClientError):
+        return False
+    
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    message = error.response.get('Error', {}).get('Message', '').lower()
+    
+    return status == 413 or ('payload' in message and 'size' in message) or 'too large' in message
+
+def pack_batches(payloads, batch_size, max_bytes=MAX_PAYLOAD_BYTES):
+    """
+    Group payloads into batches bounded by item count and serialized size
+    
+    Yields lists of (position, payload) so results can be mapped back.
+    """
+    batch = []
+    batch_bytes = 0
+    
+    for position, payload in enumerate(payloads):
+        payload_bytes = len(json.dumps(payload))
+        
+        if batch and (len(batch) >= batch_size or batch_bytes + payload_bytes > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        
+        batch.append((position, payload))
+        batch_bytes += payload_bytes
+    
+    if batch:
+        yield batch
+
+def invoke_batch(sagemaker_runtime, endpoint_name, task, payloads):
+    """
+    Send one batch to the endpoint and return one result dict per payload
+    """
+    response = sagemaker_runtime.invoke_endpoint(
+        EndpointName=endpoint_name,
+        ContentType='application/json',
+        Body=json.dumps({
+            'task': task,
+            'instances': payloads
+        })
+    )
+    
+    result = json.loads(response['Body'].read().decode('utf-8'))
+    predictions = result.get('predictions', []) if isinstance(result, dict) else result
+    
+    if len(predictions) != len(payloads):
+        raise ValueError(f"Endpoint returned {len(predictions)} predictions for {len(payloads)} instances")
+    
+    return predictions
+
+def invoke_in_batches(sagemaker_runtime, endpoint_name, task, payloads, batch_size):
+    """
+    Run inference for all payloads in micro-batches
+    
+    Batches rejected for payload size are split in half and retried.
+    Returns (results, metrics): results are aligned with `payloads`, and
+    metrics holds one entry per endpoint call with its size and latency.
+    """
+    results = [None] * len(payloads)
+    metrics = []
+    pending = list(pack_batches(payloads, batch_size))
+    
+    while pending:
+        batch = pending.pop(0)
+        started = time.perf_counter()
+        
+        try:
+            predictions = invoke_batch(sagemaker_runtime, endpoint_name, task, [payload for _, payload in batch])
+        except Exception as e:
+            if is_payload_too_large(e) and len(batch) > 1:
+                middle = len(batch) // 2
+                print(f"Batch of {len(batch)} too large for endpoint, splitting")
+                pending[:0] = [batch[:middle], batch[middle:]]
+                continue
+            raise
+        
+        latency_ms = (time.perf_counter() - started) * 1000
+        metrics.append({'size': len(batch), 'latencyMs': round(latency_ms, 1)})
+        
+        print(json.dumps({
+            'event': 'SAGEMAKER_BATCH',
+            'task': task,
+            'batchSize': len(batch),
+            'latencyMs': round(latency_ms, 1)
+        }))
+        
+        for (position, _), prediction in zip(batch, predictions):
+            results[position] = prediction
+    
+    return results, metrics
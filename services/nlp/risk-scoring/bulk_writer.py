@@ -0,0 +1,96 @@
+"""
+Bulk DynamoDB profile writer
+
+Buffers items into 25-item BatchWriteItem calls and retries unprocessed
+items with jittered exponential backoff. Shared by the risk-scoring Lambda,
+the re-tiering job and the populate-test-data script.
+"""
+
+from decimal import Decimal
+
+from backoff import send_with_retries
+
+# DynamoDB BatchWriteItem limit
+BATCH_WRITE_SIZE = 25
+
+def convert_floats_to_decimal(obj):
+    """Convert floats to Decimal for DynamoDB"""
+    if isinstance(obj, list):
+        return [convert_floats_to_decimal(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {k: convert_floats_to_decimal(v) for k, v in obj.items()}
+    elif isinstance(obj, float):
+        return Decimal(str(obj))
+    else:
+        return obj
+
+class BulkWriter:
+    """
+    Buffered BatchWriteItem writer for a single table
+    
+    Use as a context manager so the final partial batch is flushed:
+        
+        with BulkWriter(table) as writer:
+            for item in items:
+                writer.put(item)
+    """
+    
+    def __init__(self, table, key_attributes=('entityId', 'asOfTs'), max_retries=8,
+                 base_delay=0.05, max_delay=5.0):
+        self.table = table
+        self.key_attributes = key_attributes
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.buffer = {}
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+    
+    def put(self, item):
+        """
+        Queue an item for writing, converting floats to Decimal
+        
+        A later item with the same key replaces an earlier buffered one,
+        matching put_item semantics (BatchWriteItem rejects duplicate keys).
+        """
+        key = tuple(item[attribute] for attribute in self.key_attributes)
+        self.buffer[key] = convert_floats_to_decimal(item)
+        
+        if len(self.buffer) >= BATCH_WRITE_SIZE:
+            self.flush()
+    
+    def flush(self):
+        """
+        Write all buffered items in 25-item batches
+        """
+        items = list(self.buffer.values())
+        self.buffer = {}
+        
+        for start in range(0, len(items), BATCH_WRITE_SIZE):
+            self._write_batch(items[start:start + BATCH_WRITE_SIZE])
+    
+    def _write_batch(self, items):
+        def send(requests):
+            response = self.table.meta.client.batch_write_item(
+                RequestItems={self.table.name: requests}
+            )
+            self.batches += 1
+            
+            unprocessed = response.get('UnprocessedItems', {}).get(self.table.name, [])
+            self.written += len(requests) - len(unprocessed)
+            return unprocessed
+        
+        self.retries += send_with_retries(
+            send,
+            [{'PutRequest': {'Item': item}} for item in items],
+            self.max_retries, self.base_delay, self.max_delay,
+            'items still unprocessed'
+        )
@@ -0,0 +1,73 @@
+"""
+Batched EventBridge emitter for Risk Updated events
+
+Accumulates entries into 10-entry put_events calls (the API maximum) and
+re-sends only the entries EventBridge reports as failed.
+"""
+
+import json
+
+from backoff import send_with_retries
+
+# EventBridge PutEvents limit
+PUT_EVENTS_BATCH_SIZE = 10
+
+class EventEmitter:
+    """
+    Buffered put_events sender for one source/detail-type pair
+    """
+    
+    def __init__(self, events_client, source='aegis.risk', detail_type='Risk Updated',
+                 max_retries=5, base_delay=0.1, max_delay=5.0):
+        self.events_client = events_client
+        self.source = source
+        self.detail_type = detail_type
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.buffer = []
+        self.sent = 0
+        self.calls = 0
+        self.retries = 0
+    
+    def emit(self, detail):
+        """
+        Queue one event; a full batch is sent immediately
+        """
+        self.buffer.append({
+            'Source': self.source,
+            'DetailType': self.detail_type,
+            'Detail': json.dumps(detail)
+        })
+        
+        if len(self.buffer) >= PUT_EVENTS_BATCH_SIZE:
+            self.flush()
+    
+    def flush(self):
+        """
+        Send all queued events in 10-entry batches
+        """
+        entries = self.buffer
+        self.buffer = []
+        
+        for start in range(0, len(entries), PUT_EVENTS_BATCH_SIZE):
+            self._send_batch(entries[start:start + PUT_EVENTS_BATCH_SIZE])
+    
+    def _send_batch(self, entries):
+        def send(entries):
+            response = self.events_client.put_events(Entries=entries)
+            self.calls += 1
+            
+            # Result entries line up with request entries; failed ones carry an ErrorCode
+            failed = [
+                entry for entry, result in zip(entries, response.get('Entries', []))
+                if result.get('ErrorCode')
+            ] if response.get('FailedEntryCount', 0) else []
+            
+            self.sent += len(entries) - len(failed)
+            return failed
+        
+        self.retries += send_with_retries(
+            send, entries, self.max_retries, self.base_delay, self.max_delay,
+            'events still failing'
+        )
@@ -1,23 +1,80 @@
 import json
 import os
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
 
+from batch_inference import invoke_in_batches
+from bulk_writer import BulkWriter, convert_floats_to_decimal
+from event_emitter import EventEmitter
+from thresholds import ThresholdProvider
+
+# Parallel reads of previous profiles for change detection
+READ_CONCURRENCY = int(os.environ.get('READ_CONCURRENCY', '16'))
+
 s3 = boto3.client('s3')
 sagemaker_runtime = boto3.client('sagemaker-runtime')
-dynamodb = boto3.resource('dynamodb')
+dynamodb = boto3.resource('dynamodb', config=Config(max_pool_connections=READ_CONCURRENCY))
 events = boto3.client('events')
 
 SAGEMAKER_ENDPOINT = os.environ['SAGEMAKER_ENDPOINT']
 RISK_TABLE_NAME = os.environ['RISK_TABLE_NAME']
+INFERENCE_BATCH_SIZE = int(os.environ.get('INFERENCE_BATCH_SIZE', '64'))
 
 table = dynamodb.Table(RISK_TABLE_NAME)
 
+# Admin threshold changes are picked up within THRESHOLDS_TTL_SECONDS
+threshold_provider = ThresholdProvider(table)
+
+def fetch_previous_profiles(entity_ids):
+    """
+    Latest stored score/status/riskLevel/evidence for each entity, read in parallel
+    Entities with no stored profile are absent from the result
+    """
+    def fetch(entity_id):
+        response = table.meta.client.query(
+            TableName=RISK_TABLE_NAME,
+            KeyConditionExpression='entityId = :eid',
+            ExpressionAttributeValues={':eid': entity_id},
+            ProjectionExpression='score, #s, riskLevel, evidence',
+            ExpressionAttributeNames={'#s': 'status'},
+            ScanIndexForward=False,
+            Limit=1
+        )
+        items = response.get('Items', [])
+        return entity_id, items[0] if items else None
+    
+    with ThreadPoolExecutor(max_workers=READ_CONCURRENCY) as executor:
+        return {
+            entity_id: item
+            for entity_id, item in executor.map(fetch, set(entity_ids))
+            if item
+        }
+
+def has_changed(previous, risk_score, status, risk_level, evidence):
+    """
+    True if a new score, status, riskLevel or evidence differs from the
+    entity's previous profile
+    
+    Evidence counts as a change because screening returns it, so cached
+    profiles and webhook subscribers must hear about it too.
+    """
+    if previous is None:
+        return True
+    return (
+        previous.get('status') != status
+        or previous.get('riskLevel') != risk_level
+        or abs(float(previous.get('score', -1)) - risk_score) > 1e-6
+        or previous.get('evidence', []) != convert_floats_to_decimal(evidence)
+    )
+
 def handler(event, context):
     """
     Financial Crime Risk Classification & Scoring using SageMaker
-    Produces risk score (0-1) and status (CLEAR/REVIEW_REQUIRED)
+    Produces risk score (0-1), status (CLEAR/REVIEW_REQUIRED) and risk level
+    against the admin-configured thresholds
     """
     try:
         # Get resolved entities
@@ -33,28 +90,41 @@ def handler(event, context):
         
         risk_profiles = []
         
-        for entity in resolved_entities:
-            # Invoke SageMaker for risk classification
-            sagemaker_response = sagemaker_runtime.invoke_endpoint(
-                EndpointName=SAGEMAKER_ENDPOINT,
-                ContentType='application/json',
-                Body=json.dumps({
+        # Invoke SageMaker for risk classification in micro-batches
+        results, batch_metrics = invoke_in_batches(
+            sagemaker_runtime,
+            SAGEMAKER_ENDPOINT,
+            'risk_classification',
+            [
+                {
                     'entity': entity['canonicalName'],
                     'type': entity['type'],
                     'aliases': entity.get('aliases', []),
-                    'metadata': entity.get('metadata', {}),
-                    'task': 'risk_classification'
-                })
-            )
-            
-            result = json.loads(sagemaker_response['Body'].read().decode('utf-8'))
-            
+                    'metadata': entity.get('metadata', {})
+                }
+                for entity in resolved_entities
+            ],
+            INFERENCE_BATCH_SIZE
+        )
+        
+        # Previous profiles decide which entities actually changed
+        previous_profiles = fetch_previous_profiles(e['canonicalId'] for e in resolved_entities)
+        
+        # One thresholds version for the whole batch
+        thresholds = threshold_provider.get()
+        
+        writer = BulkWriter(table)
+        # Keyed by entity: a repeated entity is written once (the last one wins
+        # in the writer too) and announced at most once
+        risk_updates = {}
+        
+        for entity, result in zip(resolved_entities, results):
             # Calculate risk score (0-1)
             risk_score = result.get('risk_score', 0.0)
             risk_factors = result.get('risk_factors', [])
             
-            # Determine status based on threshold
-            status = 'REVIEW_REQUIRED' if risk_score >= 0.3 else 'CLEAR'
+            # Determine status and tier based on thresholds
+            status, risk_level = thresholds.classify(risk_score)
             
             # Build evidence array
             evidence = []
@@ -76,6 +146,8 @@ def handler(event, context):
                 'name': entity['canonicalName'],
                 'score': Decimal(str(risk_score)),
                 'status': status,
+                'riskLevel': risk_level,
+                'thresholdsVersion': thresholds.version,
                 'evidence': evidence,
                 'entityType': entity['type'],
                 'aliases': entity.get('aliases', []),
@@ -87,28 +159,41 @@ def handler(event, context):
             if entity['type'] == 'PERSON':
                 item['company'] = entity.get('metadata', {}).get('company', 'UNKNOWN')
             
-            table.put_item(Item=item)
+            writer.put(item)
             
             risk_profiles.append({
                 'entityId': entity_id,
                 'riskScore': risk_score,
-                'status': status
+                'status': status,
+                'riskLevel': risk_level
             })
             
-            # Emit EventBridge event for risk updates
-            events.put_events(
-                Entries=[{
-                    'Source': 'aegis.risk',
-                    'DetailType': 'Risk Updated',
-                    'Detail': json.dumps({
-                        'entityId': entity_id,
-                        'entityName': entity['canonicalName'],
-                        'riskScore': risk_score,
-                        'status': status,
-                        'timestamp': datetime.utcnow().isoformat()
-                    })
-                }]
-            )
+            if has_changed(previous_profiles.get(entity_id), risk_score, status, risk_level, evidence):
+                risk_updates[entity_id] = {
+                    'entityId': entity_id,
+                    'entityName': entity['canonicalName'],
+                    'entityType': entity['type'],
+                    'riskScore': risk_score,
+                    'status': status,
+                    'riskLevel': risk_level
+                }
+            else:
+                risk_updates.pop(entity_id, None)
+        
+        # Write remaining buffered profiles before announcing them
+        writer.flush()
+        print(f"Wrote {writer.written} profiles in {writer.batches} BatchWriteItem calls ({writer.retries} retries)")
+        
+        # Emit EventBridge events for changed profiles only, 10 per call
+        emitter = EventEmitter(events)
+        for update in risk_updates.values():
+            emitter.emit({
+                **update,
+                'timestamp': datetime.utcnow().isoformat()
+            })
+        emitter.flush()
+        print(f"Emitted {emitter.sent} Risk Updated events in {emitter.calls} put_events calls "
+              f"({len(risk_profiles) - len(risk_updates)} unchanged profiles skipped)")
         
         print(f"Risk scoring complete: {len(risk_profiles)} profiles created")
         
@@ -118,7 +203,13 @@ def handler(event, context):
             'summary': {
                 'total': len(risk_profiles),
                 'clear': sum(1 for p in risk_profiles if p['status'] == 'CLEAR'),
-                'reviewRequired': sum(1 for p in risk_profiles if p['status'] == 'REVIEW_REQUIRED')
+                'reviewRequired': sum(1 for p in risk_profiles if p['status'] == 'REVIEW_REQUIRED'),
+                'eventsEmitted': len(risk_updates),
+                'thresholdsVersion': thresholds.version
+            },
+            'inference': {
+                'batches': len(batch_metrics),
+                'totalLatencyMs': round(sum(m['latencyMs'] for m in batch_metrics), 1)
             }
         }
         
@@ -0,0 +1,259 @@
+"""
+Re-tiering job: re-applies the current risk thresholds to stored profiles
+
+Triggered by the Thresholds Updated event admin-thresholds emits (or run
+by hand). Recomputes status and riskLevel of every entity's latest profile
+from its stored score, without model inference, and rewrites only the
+profiles whose tier changed.
+
+The table is read with a parallel scan, one thread per segment, through the
+plain DynamoDB client so unchanged items are never deserialized. A scan
+returns a partition's items together in asOfTs order, so an entity's
+latest profile is the last item before the entityId changes. Changed
+profiles are written back in place (same key) in BatchWriteItem batches, so
+a newer profile written by risk-scoring meanwhile is never shadowed, and
+each segment announces them as compact Risk Updated events after every
+page is written. Right before that, each changed entity's latest asOfTs is
+read again; an entity rescored since the scan is left alone, so subscribers
+never get a RETIERED status older than the rescored one.
+
+Close to the Lambda timeout the job stops, and invokes itself again with
+the remaining segment cursors.
+"""
+
+import json
+import os
+import threading
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from bulk_writer import BulkWriter
+from event_emitter import EventEmitter
+from thresholds import load_thresholds
+
+RISK_TABLE_NAME = os.environ['RISK_TABLE_NAME']
+TOTAL_SEGMENTS = int(os.environ.get('RETIER_SEGMENTS', '16'))
+
+# Stop scanning this long before the Lambda timeout and continue in a new invocation
+TIME_MARGIN_MS = int(os.environ.get('RETIER_TIME_MARGIN_SECONDS', '60')) * 1000
+
+dynamodb_client = boto3.client('dynamodb', config=Config(max_pool_connections=TOTAL_SEGMENTS * 2))
+dynamodb = boto3.resource('dynamodb', config=Config(max_pool_connections=TOTAL_SEGMENTS * 2))
+events = boto3.client('events')
+lambda_client = boto3.client('lambda')
+
+table = dynamodb.Table(RISK_TABLE_NAME)
+deserializer = TypeDeserializer()
+
+def attribute(item, name):
+    """
+    Plain value of a string or number attribute of a raw item, or None
+    """
+    value = item.get(name)
+    if value is None:
+        return None
+    return value.get('S', value.get('N'))
+
+def retier_profile(item, thresholds, retiered_at):
+    """
+    (profile to write, change event) for a raw latest-profile item whose
+    tier differs under thresholds, or None if it is unchanged
+    """
+    score = float(item['score']['N'])
+    status, risk_level = thresholds.classify(score)
+    previous_status = attribute(item, 'status')
+    previous_level = attribute(item, 'riskLevel')
+    
+    if previous_status == status and previous_level == risk_level:
+        return None
+    
+    profile = {name: deserializer.deserialize(value) for name, value in item.items()}
+    profile['status'] = status
+    profile['riskLevel'] = risk_level
+    profile['thresholdsVersion'] = thresholds.version
+    profile['retieredAt'] = retiered_at
+    
+    # Filling in a missing riskLevel alone is not worth announcing
+    if previous_status == status and previous_level is None:
+        return profile, None
+    
+    return profile, {
+        'entityId': profile['entityId'],
+        'entityName': profile.get('name', ''),
+        'entityType': profile.get('entityType'),
+        'riskScore': score,
+        'status': status,
+        'riskLevel': risk_level,
+        'previousStatus': previous_status,
+        'thresholdsVersion': thresholds.version,
+        'reason': 'RETIERED',
+        'timestamp': retiered_at
+    }
+
+def latest_as_of(entity_id):
+    """
+    asOfTs of an entity's latest profile, read consistently
+    """
+    response = table.query(
+        KeyConditionExpression='entityId = :eid',
+        ExpressionAttributeValues={':eid': entity_id},
+        ProjectionExpression='asOfTs',
+        ConsistentRead=True,
+        ScanIndexForward=False,
+        Limit=1
+    )
+    items = response.get('Items', [])
+    return items[0]['asOfTs'] if items else None
+
+class SegmentJob:
+    """
+    Scan of one segment, resumable from a cursor
+    """
+    
+    def __init__(self, segment, total_segments, cursor, thresholds, deadline):
+        self.segment = segment
+        self.total_segments = total_segments
+        self.cursor = cursor
+        self.thresholds = thresholds
+        self.deadline = deadline
+        self.done = False
+        self.changes = []
+        self.stats = {'scanned': 0, 'profiles': 0, 'changed': 0, 'superseded': 0, 'events': 0}
+    
+    def run(self):
+        writer = BulkWriter(table)
+        emitter = EventEmitter(events)
+        retiered_at = datetime.utcnow().isoformat()
+        
+        # Latest item seen so far and the key of the item before it; the
+        # pending entity is only complete once a different entityId follows
+        pending = None
+        before_pending = self.cursor
+        start_key = self.cursor
+        
+        while True:
+            scan = {
+                'TableName': RISK_TABLE_NAME,
+                'Segment': self.segment,
+                'TotalSegments': self.total_segments,
+                'FilterExpression': 'attribute_exists(score) AND NOT begins_with(entityId, :config)',
+                'ExpressionAttributeValues': {':config': {'S': 'CONFIG:'}}
+            }
+            if start_key:
+                scan['ExclusiveStartKey'] = start_key
+            response = dynamodb_client.scan(**scan)
+            self.stats['scanned'] += response.get('ScannedCount', 0)
+            
+            for item in response.get('Items', []):
+                if pending is not None and item['entityId'] != pending['entityId']:
+                    self._retier(pending, writer, retiered_at)
+                    before_pending = {'entityId': pending['entityId'], 'asOfTs': pending['asOfTs']}
+                pending = item
+            
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key:
+                if pending is not None:
+                    self._retier(pending, writer, retiered_at)
+                self.done = True
+                break
+            
+            # Write and announce each page's changes before reading on
+            self._flush(writer, emitter)
+            
+            if self.deadline():
+                # Resume just before the pending entity so it is seen again in full
+                self.cursor = before_pending
+                break
+        
+        self._flush(writer, emitter)
+        return self
+    
+    def _retier(self, item, writer, retiered_at):
+        self.stats['profiles'] += 1
+        result = retier_profile(item, self.thresholds, retiered_at)
+        if result is None:
+            return
+        
+        self.changes.append(result)
+    
+    def _flush(self, writer, emitter):
+        announce = []
+        for profile, change in self.changes:
+            # Rescored since it was scanned: the newer profile already has
+            # the current tier and its own event
+            if latest_as_of(profile['entityId']) != profile['asOfTs']:
+                self.stats['superseded'] += 1
+                continue
+            writer.put(profile)
+            self.stats['changed'] += 1
+            if change is not None:
+                announce.append(change)
+        self.changes = []
+        
+        # Announce only once the rewrites are stored
+        writer.flush()
+        for change in announce:
+            emitter.emit(change)
+        emitter.flush()
+        self.stats['events'] += len(announce)
+
+def handler(event, context):
+    """
+    Re-tier all latest profiles against the current thresholds
+    
+    A continuation invocation carries totalSegments and the cursors of the
+    segments still to scan; any other event starts a full run.
+    """
+    try:
+        thresholds = load_thresholds(table)
+        total_segments = event.get('totalSegments', TOTAL_SEGMENTS)
+        cursors = event.get('cursors') or {str(segment): None for segment in range(total_segments)}
+        
+        stop = threading.Event()
+        
+        def deadline():
+            if context is not None and context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+                stop.set()
+            return stop.is_set()
+        
+        jobs = [
+            SegmentJob(int(segment), total_segments, cursor, thresholds, deadline)
+            for segment, cursor in cursors.items()
+        ]
+        
+        print(f"Re-tiering {len(jobs)}/{total_segments} segments against thresholds version {thresholds.version}")
+        
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            list(executor.map(lambda job: job.run(), jobs))
+        
+        totals = {name: sum(job.stats[name] for job in jobs) for name in jobs[0].stats}
+        remaining = {str(job.segment): job.cursor for job in jobs if not job.done}
+        
+        print(json.dumps({
+            'event': 'PROFILES_RETIERED',
+            'thresholdsVersion': thresholds.version,
+            'complete': not remaining,
+            **totals
+        }))
+        
+        if remaining:
+            # Continue where this invocation stopped
+            lambda_client.invoke(
+                FunctionName=context.function_name,
+                InvocationType='Event',
+                Payload=json.dumps({'totalSegments': total_segments, 'cursors': remaining})
+            )
+        
+        return {
+            'statusCode': 200,
+            'thresholdsVersion': thresholds.version,
+            'complete': not remaining,
+            'summary': totals
+        }
+        
+    except Exception as e:
+        print(f"Error re-tiering profiles: {str(e)}")
+        raise
@@ -0,0 +1,144 @@
+"""
+Re-tiering job: resuming an interrupted segment and skipping entities
+rescored during the scan
+"""
+
+import json
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip('boto3')
+
+os.environ.setdefault('RISK_TABLE_NAME', 'test-risk-profiles')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import retier
+from thresholds import Thresholds
+
+PAGE_SIZE = 3
+
+def raw_item(entity_id, as_of_ts, score, status):
+    return {
+        'entityId': {'S': entity_id},
+        'asOfTs': {'N': str(as_of_ts)},
+        'name': {'S': entity_id},
+        'score': {'N': str(score)},
+        'status': {'S': status},
+        'riskLevel': {'S': 'LOW'}
+    }
+
+def key_of(item):
+    return (item['entityId']['S'], int(item['asOfTs']['N']))
+
+class FakeTable:
+    """
+    Risk table holding raw items in scan order (by entity, then asOfTs),
+    served to the job's scan, query and BatchWriteItem calls
+    """
+    
+    name = 'test-risk-profiles'
+    
+    def __init__(self, items):
+        self.items = sorted(items, key=key_of)
+        self.written = []
+        self.meta = self
+        self.client = self
+    
+    # dynamodb client: one segment, PAGE_SIZE items per page
+    def scan(self, ExclusiveStartKey=None, **kwargs):
+        start = 0
+        if ExclusiveStartKey:
+            start = next(
+                i + 1 for i, item in enumerate(self.items)
+                if key_of(item) == key_of(ExclusiveStartKey)
+            )
+        page = self.items[start:start + PAGE_SIZE]
+        response = {'Items': page, 'ScannedCount': len(page)}
+        if start + PAGE_SIZE < len(self.items):
+            last = page[-1]
+            response['LastEvaluatedKey'] = {'entityId': last['entityId'], 'asOfTs': last['asOfTs']}
+        return response
+    
+    # table resource: latest asOfTs of an entity
+    def query(self, ExpressionAttributeValues, **kwargs):
+        entity_id = ExpressionAttributeValues[':eid']
+        as_of = [key_of(item)[1] for item in self.items if item['entityId']['S'] == entity_id]
+        return {'Items': [{'asOfTs': Decimal(max(as_of))}] if as_of else []}
+    
+    def batch_write_item(self, RequestItems):
+        self.written.extend(request['PutRequest']['Item'] for request in RequestItems[self.name])
+        return {}
+
+class FakeEvents:
+    def __init__(self):
+        self.details = []
+    
+    def put_events(self, Entries):
+        self.details.extend(json.loads(entry['Detail']) for entry in Entries)
+        return {'FailedEntryCount': 0, 'Entries': [{} for _ in Entries]}
+
+@pytest.fixture
+def fakes(monkeypatch):
+    def install(items):
+        table = FakeTable(items)
+        events = FakeEvents()
+        monkeypatch.setattr(retier, 'dynamodb_client', table)
+        monkeypatch.setattr(retier, 'table', table)
+        monkeypatch.setattr(retier, 'events', events)
+        return table, events
+    return install
+
+THRESHOLDS = Thresholds({'REVIEW_REQUIRED': 0.5, 'MEDIUM': 0.3, 'HIGH': 0.5, 'CRITICAL': 0.7}, version=2)
+
+def test_resumes_before_pending_entity_after_deadline(fakes):
+    items = [
+        raw_item('a', 1, 0.2, 'CLEAR'),
+        raw_item('a', 2, 0.6, 'CLEAR'),
+        raw_item('b', 1, 0.1, 'CLEAR'),
+        raw_item('b', 2, 0.1, 'CLEAR'),
+        raw_item('b', 3, 0.8, 'CLEAR'),
+        raw_item('c', 1, 0.9, 'CLEAR'),
+        raw_item('d', 1, 0.55, 'CLEAR')
+    ]
+    table, events = fakes(items)
+    
+    # Stops after the first page, which ends inside entity b
+    first = retier.SegmentJob(0, 1, None, THRESHOLDS, deadline=lambda: True).run()
+    
+    assert not first.done
+    # b was still pending, so the cursor is the last key of a
+    assert first.cursor == {'entityId': {'S': 'a'}, 'asOfTs': {'N': '2'}}
+    assert [(p['entityId'], p['asOfTs']) for p in table.written] == [('a', 2)]
+    
+    second = retier.SegmentJob(0, 1, first.cursor, THRESHOLDS, deadline=lambda: False).run()
+    
+    assert second.done
+    written = [(p['entityId'], p['asOfTs']) for p in table.written]
+    assert written == [('a', 2), ('b', 3), ('c', 1), ('d', 1)]
+    # Every entity is tiered from its latest profile exactly once
+    assert sorted(detail['entityId'] for detail in events.details) == ['a', 'b', 'c', 'd']
+    assert all(detail['reason'] == 'RETIERED' for detail in events.details)
+
+def test_skips_entity_rescored_during_scan(fakes):
+    items = [raw_item('a', 1, 0.9, 'CLEAR'), raw_item('b', 1, 0.9, 'CLEAR')]
+    table, events = fakes(items)
+    
+    # risk-scoring writes a newer profile of a after it was scanned
+    original_query = table.query
+    
+    def query(**kwargs):
+        table.items.append(raw_item('a', 5, 0.1, 'CLEAR'))
+        table.query = original_query
+        return original_query(**kwargs)
+    
+    table.query = query
+    
+    job = retier.SegmentJob(0, 1, None, THRESHOLDS, deadline=lambda: False).run()
+    
+    assert [p['entityId'] for p in table.written] == ['b']
+    assert [detail['entityId'] for detail in events.details] == ['b']
+    assert job.stats['superseded'] == 1
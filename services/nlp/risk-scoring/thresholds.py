@@ -0,0 +1,105 @@
+"""
+Risk threshold provider
+
+admin-thresholds keeps the current cutoffs together in one config item,
+CONFIG:thresholds, next to the per-type CONFIG:threshold:{type} history it
+already wrote, and atomically bumps the item's version on every update. A
+query on that one partition reads all thresholds at once, so scorers hold
+one snapshot in memory and reload it after a short TTL instead of reading
+config per entity.
+A failed reload keeps the last snapshot; before the first load the defaults
+(the cutoffs that used to be hard-coded) apply.
+"""
+
+import os
+import threading
+import time
+
+THRESHOLDS_CONFIG_ID = 'CONFIG:thresholds'
+
+THRESHOLDS_TTL_SECONDS = float(os.environ.get('THRESHOLDS_TTL_SECONDS', '5'))
+
+# Threshold type -> default cutoff; REVIEW_REQUIRED decides the status,
+# the others the riskLevel tier (LOW below MEDIUM)
+DEFAULT_THRESHOLDS = {
+    'REVIEW_REQUIRED': 0.3,
+    'MEDIUM': 0.3,
+    'HIGH': 0.5,
+    'CRITICAL': 0.7
+}
+
+RISK_LEVELS = ['CRITICAL', 'HIGH', 'MEDIUM']
+
+class Thresholds:
+    """
+    Immutable snapshot of the cutoffs at one config version
+    """
+    
+    def __init__(self, values=None, version=0):
+        self.values = {**DEFAULT_THRESHOLDS, **(values or {})}
+        self.version = version
+    
+    def status(self, risk_score):
+        return 'REVIEW_REQUIRED' if risk_score >= self.values['REVIEW_REQUIRED'] else 'CLEAR'
+    
+    def risk_level(self, risk_score):
+        for level in RISK_LEVELS:
+            if risk_score >= self.values[level]:
+                return level
+        return 'LOW'
+    
+    def classify(self, risk_score):
+        """
+        (status, riskLevel) for a score
+        """
+        return self.status(risk_score), self.risk_level(risk_score)
+
+def load_thresholds(table):
+    """
+    Snapshot from the CONFIG:thresholds item (defaults if there is none)
+    """
+    response = table.query(
+        KeyConditionExpression='entityId = :eid',
+        ExpressionAttributeValues={':eid': THRESHOLDS_CONFIG_ID},
+        ConsistentRead=True,
+        ScanIndexForward=False,
+        Limit=1
+    )
+    
+    items = response.get('Items', [])
+    if not items:
+        return Thresholds()
+    
+    item = items[0]
+    values = {name: float(item[name]) for name in DEFAULT_THRESHOLDS if name in item}
+    return Thresholds(values, int(item.get('version', 0)))
+
+class ThresholdProvider:
+    """
+    Thresholds cached for ttl seconds; call get() once per batch so every
+    entity in it is classified against the same version
+    """
+    
+    def __init__(self, table, ttl=THRESHOLDS_TTL_SECONDS):
+        self.table = table
+        self.ttl = ttl
+        self.current = Thresholds()
+        self.expires = 0.0
+        self.lock = threading.Lock()
+    
+    def get(self):
+        if time.monotonic() < self.expires:
+            return self.current
+        
+        with self.lock:
+            if time.monotonic() < self.expires:
+                return self.current
+            try:
+                loaded = load_thresholds(self.table)
+                if loaded.version != self.current.version:
+                    print(f"Loaded risk thresholds version {loaded.version}: {loaded.values}")
+                self.current = loaded
+            except Exception as e:
+                print(f"Error loading risk thresholds, keeping version {self.current.version}: {str(e)}")
+            self.expires = time.monotonic() + self.ttl
+            return self.current
@@ -1,36 +1,231 @@
+import codecs
+import gzip
 import json
 import os
 import boto3
 import re
 from datetime import datetime
 
+from streaming import MultipartWriter, StreamingRedactor
+
 s3 = boto3.client('s3')
 
+# Streaming configuration: memory is bounded by these, not by object size
+CHUNK_BYTES = int(os.environ.get('REDACTION_CHUNK_BYTES', str(1024 * 1024)))
+OVERLAP_CHARS = int(os.environ.get('REDACTION_OVERLAP_CHARS', '1024'))  # >= longest possible match
+PART_BYTES = int(os.environ.get('REDACTION_PART_BYTES', str(8 * 1024 * 1024)))
+# Redactions kept (with positions) for the audit log; the rest are only counted
+SAMPLE_SIZE = int(os.environ.get('REDACTION_SAMPLE_SIZE', '50'))
+
+# "text" (default) scans whole objects as text; "fields" opts in to redacting
+# JSON and NDJSON records field by field
+REDACTION_MODE = os.environ.get('REDACTION_MODE', 'text')
+# In fields mode a single JSON document is parsed in memory, so only documents
+# up to this size are; larger ones are streamed as text
+STRUCTURED_MAX_BYTES = int(os.environ.get('REDACTION_STRUCTURED_MAX_BYTES', str(4 * 1024 * 1024)))
+
 # PII patterns for redaction
+# Combined into one alternation below: where two patterns match at the same
+# position the earlier one wins, so longer formats come before PHONE
 PII_PATTERNS = {
     'SSN': r'\b\d{3}-\d{2}-\d{4}\b',
+    'CREDIT_CARD': r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',
     'EMAIL': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-    'PHONE': r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
-    'CREDIT_CARD': r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b'
+    'PHONE': r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'
 }
 
-def redact_pii(text):
+def compile_patterns(patterns):
+    """
+    Compile PII patterns into one scanner; the named group that matched is the PII type
+    A leading \\b shared by every pattern is tested once instead of per
+    alternative, so most positions are rejected on the first check
     """
-    Redact PII from text using regex patterns
+    if all(pattern.startswith(r'\b') for pattern in patterns.values()):
+        alternatives = '|'.join(f'(?P<{pii_type}>{pattern[2:]})' for pii_type, pattern in patterns.items())
+        return re.compile(rf'\b(?:{alternatives})')
+    return re.compile('|'.join(f'(?P<{pii_type}>{pattern})' for pii_type, pattern in patterns.items()))
+
+PII_REGEX = compile_patterns(PII_PATTERNS)
+
+# Fields mode: PII types to look for per field (dotted paths; list items
+# share their parent's path). Fields not listed get every pattern, as in text
+# mode; list identifier fields here with a narrower set to stop PHONE and
+# CREDIT_CARD matching registration numbers.
+FIELD_PATTERNS = json.loads(os.environ.get('REDACTION_FIELDS', 'null')) or {
+    'content': ['SSN', 'CREDIT_CARD', 'EMAIL', 'PHONE'],
+    'metadata.content': ['SSN', 'CREDIT_CARD', 'EMAIL', 'PHONE'],
+    'metadata.remarks': ['SSN', 'CREDIT_CARD', 'EMAIL', 'PHONE'],
+    'metadata.notes': ['SSN', 'CREDIT_CARD', 'EMAIL', 'PHONE'],
+    'metadata.contact': ['EMAIL', 'PHONE'],
+    'metadata.address': ['EMAIL', 'PHONE']
+}
+
+DEFAULT_FIELD_PATTERNS = list(PII_PATTERNS)
+
+# Dates and timestamps are never scanned
+DATE_VALUE = re.compile(r'\d{4}-\d{2}-\d{2}([T ][\d:.]+(Z|[+-]\d{2}:?\d{2})?)?')
+
+_field_regexes = {}
+
+def field_regex(path):
+    """
+    Compiled scanner for one field path, shared by fields with the same pattern set
+    """
+    pii_types = tuple(FIELD_PATTERNS.get(path, DEFAULT_FIELD_PATTERNS))
+    
+    if pii_types not in _field_regexes:
+        # Keep PII_PATTERNS order so longer formats still win
+        _field_regexes[pii_types] = compile_patterns({
+            pii_type: pattern for pii_type, pattern in PII_PATTERNS.items() if pii_type in pii_types
+        })
+    return _field_regexes[pii_types]
+
+class RedactionSummary:
+    """
+    Per-type redaction counts plus the first SAMPLE_SIZE redactions
+    
+    Stands in for a list of redactions wherever one is extended, so memory
+    and the audit log line stay bounded however much PII an object holds.
+    """
+    
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.counts = {}
+        self.sample = []
+    
+    def __len__(self):
+        return sum(self.counts.values())
+    
+    def extend(self, redactions):
+        for redaction in redactions:
+            self.counts[redaction['type']] = self.counts.get(redaction['type'], 0) + 1
+            if len(self.sample) < self.sample_size:
+                self.sample.append(redaction)
+    
+    def to_log(self):
+        return {
+            'total': len(self),
+            'byType': self.counts,
+            'sample': self.sample,
+            'sampleTruncated': len(self) > len(self.sample)
+        }
+
+def redact_pii(text, regex=PII_REGEX):
+    """
+    Redact PII from text in a single scan
+    Positions are offsets into the original text
     """
-    redacted = text
     redactions = []
     
-    for pii_type, pattern in PII_PATTERNS.items():
-        matches = re.finditer(pattern, redacted)
-        for match in matches:
-            redacted = redacted.replace(match.group(), f'[REDACTED_{pii_type}]')
-            redactions.append({
-                'type': pii_type,
-                'position': match.start()
-            })
+    def replace(match):
+        pii_type = match.lastgroup
+        redactions.append({
+            'type': pii_type,
+            'position': match.start(),
+            'end': match.end()
+        })
+        return f'[REDACTED_{pii_type}]'
     
-    return redacted, redactions
+    return regex.sub(replace, text), redactions
+
+def redact_fields(value, redactions, path=''):
+    """
+    Redact the string fields of a parsed JSON value, leaving keys, numbers,
+    booleans and dates untouched
+    Each redaction records its field path; positions are within that field
+    """
+    if isinstance(value, dict):
+        return {
+            key: redact_fields(item, redactions, f"{path}.{key}" if path else key)
+            for key, item in value.items()
+        }
+    
+    if isinstance(value, list):
+        return [redact_fields(item, redactions, path) for item in value]
+    
+    if not isinstance(value, str) or DATE_VALUE.fullmatch(value):
+        return value
+    
+    redacted, found = redact_pii(value, field_regex(path))
+    redactions.extend({**r, 'field': path} for r in found)
+    return redacted
+
+def redact_record_line(line):
+    """
+    Redact one NDJSON line field by field; lines that aren't JSON are redacted as text
+    """
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return redact_pii(line)
+    
+    redactions = []
+    redacted = redact_fields(record, redactions)
+    return json.dumps(redacted, separators=(',', ':')) + '\n', redactions
+
+def redact_text_stream(body, writer):
+    """
+    Redact a text object in overlapping chunks, writing output as it goes
+    Positions are character offsets into the whole object
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    redactor = StreamingRedactor(PII_REGEX, overlap=OVERLAP_CHARS)
+    redactions = RedactionSummary()
+    
+    for chunk in body.iter_chunks(chunk_size=CHUNK_BYTES):
+        redacted, found = redactor.feed(decoder.decode(chunk))
+        writer.write(redacted.encode('utf-8'))
+        redactions.extend(found)
+    
+    redactor.feed(decoder.decode(b'', final=True))
+    redacted, found = redactor.finish()
+    writer.write(redacted.encode('utf-8'))
+    redactions.extend(found)
+    
+    return redactions
+
+def redact_ndjson_gzip(body, writer, structured=False):
+    """
+    Redact a chunked .ndjson.gz object record by record, recompressing into writer
+    Lines are redacted as text, or field by field when structured
+    Redaction positions are relative to their line
+    """
+    redact_line = redact_record_line if structured else redact_pii
+    redactions = RedactionSummary()
+    
+    with gzip.GzipFile(fileobj=writer, mode='wb') as compressed:
+        for line_number, line in enumerate(gzip.GzipFile(fileobj=body)):
+            redacted_line, line_redactions = redact_line(line.decode('utf-8'))
+            compressed.write(redacted_line.encode('utf-8'))
+            redactions.extend({**r, 'line': line_number} for r in line_redactions)
+    
+    return redactions
+
+def redact_json_document(body, writer):
+    """
+    Redact a single JSON document field by field
+    Entries of a top-level 'records' array use record-relative field paths
+    """
+    document = json.loads(body.read())
+    redactions = RedactionSummary()
+    
+    if isinstance(document, dict) and isinstance(document.get('records'), list):
+        redacted = {}
+        for key, value in document.items():
+            if key != 'records':
+                redacted[key] = redact_fields(value, redactions, key)
+                continue
+            
+            redacted[key] = []
+            for record_number, record in enumerate(value):
+                found = []
+                redacted[key].append(redact_fields(record, found))
+                redactions.extend({**r, 'record': record_number} for r in found)
+    else:
+        redacted = redact_fields(document, redactions)
+    
+    writer.write(json.dumps(redacted).encode('utf-8'))
+    return redactions
 
 def handler(event, context):
     """
@@ -48,34 +243,46 @@ def handler(event, context):
             
             print(f"PII detected in s3://{bucket}/{key}")
             
-            # Download object
+            # Stream the object through the redactor into the sanitized copy
             response = s3.get_object(Bucket=bucket, Key=key)
-            content = response['Body'].read().decode('utf-8')
-            
-            # Redact PII
-            redacted_content, redactions = redact_pii(content)
-            
-            # Write sanitized version
             sanitized_key = f"sanitized/{key}"
-            s3.put_object(
-                Bucket=bucket,
-                Key=sanitized_key,
-                Body=redacted_content.encode('utf-8'),
+            writer = MultipartWriter(
+                s3,
+                bucket,
+                sanitized_key,
+                part_size=PART_BYTES,
                 ServerSideEncryption='aws:kms',
                 Metadata={
                     'original-key': key,
-                    'redaction-timestamp': datetime.utcnow().isoformat(),
-                    'redaction-count': str(len(redactions))
+                    'redaction-timestamp': datetime.utcnow().isoformat()
                 }
             )
             
+            structured = REDACTION_MODE == 'fields'
+            size = response.get('ContentLength')
+            
+            try:
+                if key.endswith('.ndjson.gz'):
+                    redactions = redact_ndjson_gzip(response['Body'], writer, structured)
+                elif structured and key.endswith('.json') and size is not None and size <= STRUCTURED_MAX_BYTES:
+                    redactions = redact_json_document(response['Body'], writer)
+                else:
+                    redactions = redact_text_stream(response['Body'], writer)
+                
+                # The count only fits in object metadata for single-part output;
+                # the audit log below always has it
+                writer.close(metadata={'redaction-count': str(len(redactions))})
+            except Exception:
+                writer.abort()
+                raise
+            
             # Log audit trail
             print(json.dumps({
                 'event': 'PII_REDACTION',
                 'bucket': bucket,
                 'originalKey': key,
                 'sanitizedKey': sanitized_key,
-                'redactions': redactions,
+                'redactions': redactions.to_log(),
                 'timestamp': datetime.utcnow().isoformat()
             }))
             
@@ -0,0 +1,160 @@
+"""
+Streaming redaction for large S3 objects
+
+The body is scanned chunk by chunk. A tail of `overlap` characters is held
+back from every chunk so a match that crosses a chunk boundary is found
+whole in the next scan, and a small context of already emitted text keeps
+word boundaries (\\b) correct at the seam. Output goes to S3 through a
+multipart upload as it is produced, so memory is bounded by the chunk and
+part sizes rather than the object size.
+"""
+
+import io
+
+# S3 multipart parts must be at least 5 MiB (except the last one)
+MIN_PART_BYTES = 5 * 1024 * 1024
+
+# Characters of emitted text kept for the \b check at the next chunk
+CONTEXT_CHARS = 1
+
+class StreamingRedactor:
+    """
+    Incremental redaction over a sequence of text chunks
+    
+    `overlap` must be at least the longest possible match; offsets in the
+    returned redactions are relative to the whole stream.
+    """
+    
+    def __init__(self, regex, overlap=1024):
+        self.regex = regex
+        self.overlap = overlap
+        self.context = ''
+        self.pending = ''
+        self.offset = 0
+    
+    def feed(self, text):
+        """
+        Add text; returns (redacted text that is final, redactions in it)
+        """
+        self.pending += text
+        return self._scan(final=False)
+    
+    def finish(self):
+        """
+        Flush everything still held back
+        """
+        return self._scan(final=True)
+    
+    def _scan(self, final):
+        buffer = self.context + self.pending
+        start = len(self.context)
+        limit = len(buffer) if final else len(buffer) - self.overlap
+        
+        if limit <= start:
+            return '', []
+        
+        pieces = []
+        redactions = []
+        position = start
+        
+        for match in self.regex.finditer(buffer, start):
+            if match.start() >= limit:
+                break
+            if match.end() > limit:
+                # Ends in the held-back tail; rescan it once more text arrives
+                limit = match.start()
+                break
+            
+            pii_type = match.lastgroup
+            pieces.append(buffer[position:match.start()])
+            pieces.append(f'[REDACTED_{pii_type}]')
+            redactions.append({
+                'type': pii_type,
+                'position': self.offset + match.start() - start,
+                'end': self.offset + match.end() - start
+            })
+            position = match.end()
+        
+        cut = max(position, limit)
+        pieces.append(buffer[position:cut])
+        
+        self.offset += cut - start
+        self.pending = buffer[cut:]
+        self.context = buffer[max(0, cut - CONTEXT_CHARS):cut]
+        
+        return ''.join(pieces), redactions
+
+class MultipartWriter:
+    """
+    File-like writer that uploads to S3 in multipart parts as data arrives
+    
+    Output smaller than one part is sent with a single put_object instead.
+    """
+    
+    def __init__(self, s3_client, bucket, key, part_size=MIN_PART_BYTES, **put_args):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_BYTES)
+        self.put_args = put_args
+        self.buffer = io.BytesIO()
+        self.parts = []
+        self.upload_id = None
+        self.bytes_written = 0
+    
+    def write(self, data):
+        self.buffer.write(data)
+        self.bytes_written += len(data)
+        
+        if self.buffer.tell() >= self.part_size:
+            self._upload_part()
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def close(self, metadata=None):
+        """
+        Complete the upload; metadata only applies to single-put output,
+        as a multipart upload's metadata is fixed when it starts
+        """
+        if self.upload_id is None:
+            put_args = dict(self.put_args)
+            if metadata:
+                put_args['Metadata'] = {**put_args.get('Metadata', {}), **metadata}
+            self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=self.buffer.getvalue(), **put_args)
+            return
+        
+        if self.buffer.tell():
+            self._upload_part()
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts}
+        )
+    
+    def abort(self):
+        """
+        Discard an in-progress multipart upload
+        """
+        if self.upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            self.upload_id = None
+    
+    def _upload_part(self):
+        if self.upload_id is None:
+            response = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self.put_args)
+            self.upload_id = response['UploadId']
+        
+        part_number = len(self.parts) + 1
+        response = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=self.buffer.getvalue()
+        )
+        
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.buffer = io.BytesIO()
@@ -0,0 +1,90 @@
+"""
+In-container TTL cache for tenant webhook configuration
+
+Configs are loaded from Secrets Manager once per tenant and kept for `ttl`
+seconds, so a rescoring burst costs one GetSecretValue per tenant and
+container instead of one per event. Entries used during the last
+`refresh_ahead` seconds of their life are reloaded in the background while
+the cached value keeps being served, so hot tenants never wait on a reload.
+
+A rotated secret is picked up when the entry is reloaded; callers that see
+the receiver reject a signature invalidate the tenant to reload it at once.
+"""
+
+import threading
+import time
+
+class TtlCache:
+    """
+    Per-key TTL cache with refresh-ahead and single-flight loading
+    
+    loader(key) returns the value to cache (None is cached too, for keys
+    that have nothing configured) and may raise; errors are not cached.
+    """
+    
+    def __init__(self, loader, ttl=300, refresh_ahead=60):
+        self.loader = loader
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.entries = {}
+        self.refreshing = set()
+        self.locks = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'loads': 0, 'refreshes': 0}
+    
+    def _key_lock(self, key):
+        with self.lock:
+            return self.locks.setdefault(key, threading.Lock())
+    
+    def get(self, key):
+        """
+        Cached value for key, loading it if missing or expired
+        """
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        
+        if entry and now < entry['expires']:
+            self.stats['hits'] += 1
+            if now >= entry['expires'] - self.refresh_ahead:
+                self._refresh_in_background(key)
+            return entry['value']
+        
+        # Only one thread loads a key; the others wait and reuse its result
+        with self._key_lock(key):
+            entry = self.entries.get(key)
+            if entry and time.monotonic() < entry['expires']:
+                self.stats['hits'] += 1
+                return entry['value']
+            return self._load(key)
+    
+    def invalidate(self, key):
+        """
+        Drop a cached value so the next get() reloads it
+        """
+        self.entries.pop(key, None)
+    
+    def _load(self, key):
+        value = self.loader(key)
+        self.entries[key] = {'value': value, 'expires': time.monotonic() + self.ttl}
+        self.stats['loads'] += 1
+        return value
+    
+    def _refresh_in_background(self, key):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+        
+        threading.Thread(target=self._refresh, args=(key,), daemon=True).start()
+    
+    def _refresh(self, key):
+        try:
+            with self._key_lock(key):
+                self._load(key)
+                self.stats['refreshes'] += 1
+        except Exception as e:
+            # Keep serving the cached value until it expires
+            print(f"Background refresh of {key} failed: {str(e)}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
@@ -0,0 +1,321 @@
+"""
+Webhook delivery engine
+
+Risk Updated events are fanned out to every subscribed tenant and sent over a
+pooled keep-alive session per tenant, either one request per event or, for
+tenants that opt in, coalesced into signed batch payloads. Each tenant's
+requests run concurrently up to its pool size, so a bulk rescoring burst is
+drained in parallel instead of one connection setup per event.
+
+Nothing here retries: every event comes back as delivered, retry or dead and
+the caller decides what happens next (the SQS queue redelivers retries with
+backoff and dead events go to the dead-letter queue).
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Default concurrent requests per tenant, also its connection pool size;
+# a tenant's config can override it with max_concurrency
+DELIVERY_CONCURRENCY = int(os.environ.get('DELIVERY_CONCURRENCY', '16'))
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get('CONNECT_TIMEOUT_SECONDS', '3.05'))
+READ_TIMEOUT_SECONDS = float(os.environ.get('READ_TIMEOUT_SECONDS', '10'))
+BATCH_MAX_EVENTS = int(os.environ.get('BATCH_MAX_EVENTS', '100'))
+
+# 4xx responses that are worth retrying; any other 4xx is a permanent rejection
+RETRYABLE_CLIENT_STATUSES = {408, 425, 429}
+
+# Signature rejected: the secret may have been rotated since it was cached
+AUTH_FAILURE_STATUSES = {401, 403}
+
+DELIVERED = 'delivered'
+RETRY = 'retry'
+DEAD = 'dead'
+SKIPPED = 'skipped'
+
+# Kept across warm invocations so connections are reused
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+class DeliveryError(Exception):
+    """
+    A webhook request failed; permanent failures are not retried
+    """
+    
+    def __init__(self, message, permanent=False, status=None):
+        super().__init__(message)
+        self.permanent = permanent
+        self.status = status
+
+def generate_signature(payload, secret):
+    """
+    Generate HMAC-SHA256 signature for webhook payload
+    """
+    return hmac.new(
+        secret.encode(),
+        payload.encode(),
+        hashlib.sha256
+    ).hexdigest()
+
+def signing_key(secret):
+    """
+    HMAC-SHA256 object keyed with secret, to be copied for each payload
+    
+    Copying skips re-encoding the secret and hashing the key pads, which
+    generate_signature repeats on every call.
+    """
+    return hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+def sign(config, payload_bytes):
+    """
+    Signature of a payload with the config's prepared key, if it has one
+    """
+    key = config.get('signing_key')
+    if key is None:
+        return generate_signature(payload_bytes.decode(), config['hmac_secret'])
+    
+    mac = key.copy()
+    mac.update(payload_bytes)
+    return mac.hexdigest()
+
+def tenant_concurrency(config):
+    """
+    Concurrent requests allowed to one tenant's endpoint
+    """
+    return max(1, int(config.get('max_concurrency', DELIVERY_CONCURRENCY)))
+
+def get_session(tenant_id, config):
+    """
+    Keep-alive session for a tenant's endpoint
+    
+    A new session is created when the tenant's URL, mTLS certificate or
+    concurrency changes, so a rotated config never reuses the old connections.
+    """
+    cert = None
+    if 'mtls_cert' in config and 'mtls_key' in config:
+        cert = (config['mtls_cert'], config['mtls_key'])
+    identity = (config['url'], cert, tenant_concurrency(config))
+    
+    with _sessions_lock:
+        cached = _sessions.get(tenant_id)
+        if cached and cached[0] == identity:
+            return cached[1]
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=tenant_concurrency(config), pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.cert = cert
+        
+        if cached:
+            cached[1].close()
+        _sessions[tenant_id] = (identity, session)
+        return session
+
+def build_payload(event):
+    """
+    Webhook payload for one Risk Updated event
+    
+    eventId is stable across redeliveries so receivers can deduplicate.
+    """
+    detail = event['detail']
+    return {
+        'event': 'RISK_UPDATED',
+        'eventId': event.get('id'),
+        'entityId': detail['entityId'],
+        'entityName': detail['entityName'],
+        'riskScore': detail['riskScore'],
+        'status': detail['status'],
+        'timestamp': detail['timestamp']
+    }
+
+def build_batch_payload(payloads):
+    """
+    One payload carrying several events, signed as a whole
+    """
+    return {
+        'event': 'RISK_UPDATED_BATCH',
+        'count': len(payloads),
+        'timestamp': datetime.utcnow().isoformat(),
+        'events': payloads
+    }
+
+def post_signed(session, config, payload):
+    """
+    Sign and send one payload; raises DeliveryError on failure
+    """
+    body = json.dumps(payload).encode()
+    signature = sign(config, body)
+    
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Aegis-Signature': f'sha256={signature}',
+        'X-Aegis-Timestamp': payload['timestamp']
+    }
+    
+    try:
+        response = session.post(
+            config['url'],
+            data=body,
+            headers=headers,
+            timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS)
+        )
+    except requests.RequestException as e:
+        raise DeliveryError(str(e))
+    
+    status = response.status_code
+    if status >= 400:
+        permanent = status < 500 and status not in RETRYABLE_CLIENT_STATUSES
+        raise DeliveryError(f"HTTP {status} from {config['url']}", permanent=permanent, status=status)
+    
+    return status
+
+class WebhookDispatcher:
+    """
+    Fans events out to their subscribed tenants' webhooks
+    
+    route(event) returns the tenant ids an event goes to. get_config(tenant_id)
+    returns the tenant's webhook config, or None when the tenant has no
+    webhook. Config keys used: url, hmac_secret, optional mtls_cert/mtls_key,
+    signing_key, batch (coalesce events), batch_size and max_concurrency.
+    
+    Every tenant gets its own worker pool of max_concurrency threads, so a
+    slow or failing endpoint only ever ties up its own workers.
+    
+    invalidate(tenant_id), if given, is called when a receiver rejects the
+    signature; those events are retried with the reloaded config.
+    """
+    
+    def __init__(self, get_config, route, invalidate=None):
+        self.get_config = get_config
+        self.route = route
+        self.invalidate = invalidate
+    
+    def deliver(self, items, timeout=None):
+        """
+        Deliver (item_id, event) pairs to every tenant they route to
+        
+        Returns {item_id: {tenant_id: (outcome, error)}} where outcome is
+        DELIVERED, SKIPPED (tenant has no webhook), RETRY or DEAD. An event
+        that routes to no tenant maps to an empty dict.
+        
+        Requests still unfinished after timeout seconds are reported as RETRY
+        and abandoned, so one slow tenant can't hold the whole batch past the
+        invocation's deadline.
+        """
+        outcomes = {item_id: {} for item_id, _ in items}
+        by_tenant = {}
+        
+        for item_id, event in items:
+            try:
+                tenant_ids = event.get('targets') or self.route(event)
+            except Exception as e:
+                print(f"Error routing webhook event {item_id}: {str(e)}")
+                outcomes[item_id][None] = (RETRY, str(e))
+                continue
+            for tenant_id in tenant_ids:
+                by_tenant.setdefault(tenant_id, []).append((item_id, event))
+        
+        executors = {}
+        futures = {}
+        finished = True
+        try:
+            for tenant_id, tenant_items in by_tenant.items():
+                try:
+                    config = self.get_config(tenant_id)
+                except Exception as e:
+                    # Config lookup failed (not just missing); try again later
+                    print(f"Error retrieving webhook config for {tenant_id}: {str(e)}")
+                    for item_id, _ in tenant_items:
+                        outcomes[item_id][tenant_id] = (RETRY, str(e))
+                    continue
+                
+                if not config:
+                    print(f"No webhook configured for tenant {tenant_id}")
+                    for item_id, _ in tenant_items:
+                        outcomes[item_id][tenant_id] = (SKIPPED, None)
+                    continue
+                
+                units = self._plan(tenant_id, config, tenant_items, outcomes)
+                if not units:
+                    continue
+                
+                executors[tenant_id] = ThreadPoolExecutor(
+                    max_workers=min(tenant_concurrency(config), len(units)),
+                    thread_name_prefix=f"webhook-{tenant_id}"
+                )
+                for unit in units:
+                    futures[executors[tenant_id].submit(self._send_unit, unit)] = unit
+            
+            done, not_done = wait(futures, timeout=timeout)
+            finished = not not_done
+            
+            for future in done:
+                tenant_id, unit_outcomes = future.result()
+                for item_id, outcome in unit_outcomes.items():
+                    outcomes[item_id][tenant_id] = outcome
+            
+            for future in not_done:
+                tenant_id, _, config, item_ids, _ = futures[future]
+                print(f"Webhook delivery of {len(item_ids)} event(s) to {config['url']} timed out")
+                for item_id in item_ids:
+                    outcomes[item_id][tenant_id] = (RETRY, 'Delivery did not finish before the deadline')
+        finally:
+            # Abandoned requests finish (or time out) in the background
+            for executor in executors.values():
+                executor.shutdown(wait=finished, cancel_futures=not finished)
+        
+        return outcomes
+    
+    def _plan(self, tenant_id, config, tenant_items, outcomes):
+        """
+        Split a tenant's events into requests: one per event, or batches
+        """
+        session = get_session(tenant_id, config)
+        payloads = []
+        
+        for item_id, event in tenant_items:
+            try:
+                payloads.append((item_id, build_payload(event)))
+            except (KeyError, TypeError) as e:
+                # Malformed event; retrying won't fix it
+                outcomes[item_id][tenant_id] = (DEAD, f"Malformed event: missing {e}")
+        
+        if not config.get('batch'):
+            return [(tenant_id, session, config, [item_id], payload) for item_id, payload in payloads]
+        
+        batch_size = max(1, int(config.get('batch_size', BATCH_MAX_EVENTS)))
+        units = []
+        for i in range(0, len(payloads), batch_size):
+            chunk = payloads[i:i + batch_size]
+            units.append((
+                tenant_id,
+                session,
+                config,
+                [item_id for item_id, _ in chunk],
+                build_batch_payload([payload for _, payload in chunk])
+            ))
+        return units
+    
+    def _send_unit(self, unit):
+        tenant_id, session, config, item_ids, payload = unit
+        
+        try:
+            post_signed(session, config, payload)
+        except DeliveryError as e:
+            print(f"Webhook delivery of {len(item_ids)} event(s) to {config['url']} failed: {str(e)}")
+            outcome = DEAD if e.permanent else RETRY
+            if e.status in AUTH_FAILURE_STATUSES and self.invalidate:
+                self.invalidate(tenant_id)
+                outcome = RETRY
+            return tenant_id, {item_id: (outcome, str(e)) for item_id in item_ids}
+        
+        return tenant_id, {item_id: (DELIVERED, None) for item_id in item_ids}
@@ -1,117 +1,265 @@
 import json
 import os
+import random
 import boto3
-import hmac
-import hashlib
-import requests
-from datetime import datetime
+
+from config_cache import TtlCache
+from delivery import WebhookDispatcher, signing_key, DELIVERED, SKIPPED, RETRY, DEAD
+from subscriptions import load_subscriptions
 
 secrets_manager = boto3.client('secretsmanager')
+sqs = boto3.client('sqs')
+dynamodb = boto3.resource('dynamodb')
+table = dynamodb.Table(os.environ['RISK_TABLE_NAME'])
+
+WEBHOOK_QUEUE_URL = os.environ.get('WEBHOOK_QUEUE_URL')
+DEAD_LETTER_QUEUE_URL = os.environ.get('DEAD_LETTER_QUEUE_URL')
+
+# Redelivery delay for failed events: exponential in the receive count, with jitter
+RETRY_BASE_DELAY_SECONDS = int(os.environ.get('RETRY_BASE_DELAY_SECONDS', '30'))
+RETRY_MAX_DELAY_SECONDS = min(43200, int(os.environ.get('RETRY_MAX_DELAY_SECONDS', '3600')))
+
+# Attempts per event and tenant before it goes to the dead-letter queue
+MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', '10'))
+
+# Longest DelaySeconds SQS accepts for a re-enqueued message
+SQS_MAX_DELAY_SECONDS = 900
+
+# Tenant configs are cached per container and reloaded ahead of expiry
+CONFIG_TTL_SECONDS = int(os.environ.get('WEBHOOK_CONFIG_TTL_SECONDS', '300'))
+CONFIG_REFRESH_AHEAD_SECONDS = int(os.environ.get('WEBHOOK_CONFIG_REFRESH_AHEAD_SECONDS', '60'))
+
+# Time left for re-enqueueing and reporting after deliveries are cut off
+DELIVERY_TIME_MARGIN_SECONDS = int(os.environ.get('DELIVERY_TIME_MARGIN_SECONDS', '10'))
+
+# SQS batch APIs take at most 10 entries per call
+SQS_BATCH_SIZE = 10
 
 def get_webhook_config(tenant_id):
     """
     Retrieve webhook configuration from Secrets Manager
     Includes URL, HMAC secret, and optional mTLS certificates
+    
+    Returns None when the tenant has no webhook; other errors are raised
+    so the events are retried instead of dropped. The HMAC key is prepared
+    once here and reused for every payload signed with this config.
     """
+    secret_name = f"aegis/webhooks/{tenant_id}"
     try:
-        secret_name = f"aegis/webhooks/{tenant_id}"
         response = secrets_manager.get_secret_value(SecretId=secret_name)
-        return json.loads(response['SecretString'])
-    except Exception as e:
-        print(f"Error retrieving webhook config for {tenant_id}: {str(e)}")
+    except secrets_manager.exceptions.ResourceNotFoundException:
         return None
+    
+    config = json.loads(response['SecretString'])
+    config['version'] = response.get('VersionId')
+    config['signing_key'] = signing_key(config['hmac_secret'])
+    return config
+
+webhook_configs = TtlCache(get_webhook_config, ttl=CONFIG_TTL_SECONDS, refresh_ahead=CONFIG_REFRESH_AHEAD_SECONDS)
+
+subscriptions = TtlCache(lambda _: load_subscriptions(table), ttl=CONFIG_TTL_SECONDS, refresh_ahead=CONFIG_REFRESH_AHEAD_SECONDS)
 
-def generate_signature(payload, secret):
+def route(event):
     """
-    Generate HMAC-SHA256 signature for webhook payload
+    Tenants subscribed to an event
     """
-    return hmac.new(
-        secret.encode(),
-        payload.encode(),
-        hashlib.sha256
-    ).hexdigest()
+    return subscriptions.get('subscriptions').match(event.get('detail', {}))
 
-def handler(event, context):
+dispatcher = WebhookDispatcher(webhook_configs.get, route, invalidate=webhook_configs.invalidate)
+
+def retry_delay(attempt):
     """
-    Webhook sender for risk change events
-    Supports HMAC signing and optional mTLS
+    Delay before the next attempt of a failed event
     """
-    try:
-        detail = event['detail']
-        
-        # Extract event data
-        entity_id = detail['entityId']
-        entity_name = detail['entityName']
-        risk_score = detail['riskScore']
-        status = detail['status']
-        timestamp = detail['timestamp']
-        
-        # Build webhook payload
-        payload = {
-            'event': 'RISK_UPDATED',
-            'entityId': entity_id,
-            'entityName': entity_name,
-            'riskScore': risk_score,
-            'status': status,
-            'timestamp': timestamp
-        }
-        
-        payload_json = json.dumps(payload)
-        
-        # Get tenant ID (from entity metadata or configuration)
-        # For now, using a default tenant
-        tenant_id = 'default'
-        
-        webhook_config = get_webhook_config(tenant_id)
-        
-        if not webhook_config:
-            print(f"No webhook configured for tenant {tenant_id}")
-            return {'statusCode': 200, 'body': 'No webhook configured'}
-        
-        webhook_url = webhook_config['url']
-        hmac_secret = webhook_config['hmac_secret']
-        
-        # Generate signature
-        signature = generate_signature(payload_json, hmac_secret)
-        
-        # Send webhook
-        headers = {
-            'Content-Type': 'application/json',
-            'X-Aegis-Signature': f'sha256={signature}',
-            'X-Aegis-Timestamp': timestamp
-        }
-        
-        # Optional mTLS
-        cert = None
-        if 'mtls_cert' in webhook_config and 'mtls_key' in webhook_config:
-            cert = (webhook_config['mtls_cert'], webhook_config['mtls_key'])
-        
-        response = requests.post(
-            webhook_url,
-            data=payload_json,
-            headers=headers,
-            cert=cert,
-            timeout=10
-        )
+    ceiling = min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** max(0, attempt - 1))
+    return int(random.uniform(RETRY_BASE_DELAY_SECONDS, max(RETRY_BASE_DELAY_SECONDS, ceiling)))
+
+def attempts_made(record, event):
+    """
+    Delivery attempts of a message, including those made before it was re-enqueued
+    """
+    return int(event.get('attempt', 0)) + int(record['attributes'].get('ApproximateReceiveCount', '1'))
+
+def message_for(event, tenant_ids, attempt=None):
+    """
+    Queue message body carrying an event for a subset of its tenants
+    
+    targets pins the event to those tenants so the ones that already
+    received it are not sent it again.
+    """
+    body = {k: v for k, v in event.items() if k not in ('targets', 'attempt')}
+    if None not in tenant_ids:
+        body['targets'] = sorted(tenant_ids)
+    if attempt is not None:
+        body['attempt'] = attempt
+    return json.dumps(body)
+
+def send_messages(queue_url, entries):
+    """
+    Send (entry, record) pairs in batches; returns the records of entries that failed
+    """
+    failed = []
+    for i in range(0, len(entries), SQS_BATCH_SIZE):
+        chunk = entries[i:i + SQS_BATCH_SIZE]
+        batch = [{**entry, 'Id': str(n)} for n, (entry, _) in enumerate(chunk)]
+        try:
+            response = sqs.send_message_batch(QueueUrl=queue_url, Entries=batch)
+        except Exception as e:
+            print(f"Error sending to {queue_url}: {str(e)}")
+            failed.extend(record for _, record in chunk)
+            continue
+        failed.extend(chunk[int(item['Id'])][1] for item in response.get('Failed', []))
+    return failed
+
+def schedule_retries(retries):
+    """
+    Push failed messages' next attempt out with exponential backoff
+    
+    Best effort: if this fails the messages still come back after the
+    queue's default visibility timeout.
+    """
+    if not WEBHOOK_QUEUE_URL:
+        return
+    
+    for i in range(0, len(retries), SQS_BATCH_SIZE):
+        entries = [
+            {
+                'Id': str(n),
+                'ReceiptHandle': record['receiptHandle'],
+                'VisibilityTimeout': retry_delay(attempt)
+            }
+            for n, (record, attempt) in enumerate(retries[i:i + SQS_BATCH_SIZE])
+        ]
+        try:
+            sqs.change_message_visibility_batch(QueueUrl=WEBHOOK_QUEUE_URL, Entries=entries)
+        except Exception as e:
+            print(f"Error scheduling webhook retries: {str(e)}")
+
+def error_attributes(errors):
+    return {'error': {'DataType': 'String', 'StringValue': '; '.join(sorted(set(errors)))[:1024]}}
+
+def delivery_timeout(context):
+    """
+    Seconds deliveries may take in this invocation, or None without a context
+    """
+    if context is None:
+        return None
+    return max(0, context.get_remaining_time_in_millis() / 1000 - DELIVERY_TIME_MARGIN_SECONDS)
+
+def handle_queue_batch(records, timeout=None):
+    """
+    Deliver a batch of queued events and report the ones to redeliver
+    
+    An event that failed for every tenant it went to is returned to the
+    queue as-is. One that reached some tenants but failed for others is
+    acknowledged, and the failed tenants get a new, delayed message of
+    their own so the others don't receive it twice.
+    """
+    by_id = {record['messageId']: record for record in records}
+    events = {}
+    dead = []
+    
+    for record in records:
+        try:
+            events[record['messageId']] = json.loads(record['body'])
+        except ValueError as e:
+            dead.append(({
+                'MessageBody': record['body'],
+                'MessageAttributes': error_attributes([f"Malformed message body: {str(e)}"])
+            }, record))
+    
+    outcomes = dispatcher.deliver(list(events.items()), timeout=timeout)
+    
+    redeliver = []
+    requeue = []
+    counts = {DELIVERED: 0, SKIPPED: 0}
+    
+    for message_id, event in events.items():
+        record = by_id[message_id]
+        attempt = attempts_made(record, event)
+        failed = {}
+        rejected = {}
         
-        response.raise_for_status()
+        for tenant_id, (outcome, error) in outcomes[message_id].items():
+            if outcome == RETRY:
+                failed[tenant_id] = error
+            elif outcome == DEAD:
+                rejected[tenant_id] = error
+            else:
+                counts[outcome] += 1
         
-        print(f"Webhook sent successfully to {webhook_url}: {response.status_code}")
+        if attempt >= MAX_ATTEMPTS:
+            rejected.update(failed)
+            failed = {}
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'message': 'Webhook sent',
-                'entityId': entity_id,
-                'webhookUrl': webhook_url,
-                'responseStatus': response.status_code
-            })
-        }
+        if rejected:
+            dead.append(({
+                'MessageBody': message_for(event, list(rejected)),
+                'MessageAttributes': error_attributes(rejected.values())
+            }, record))
         
-    except Exception as e:
-        print(f"Error sending webhook: {str(e)}")
-        # Don't fail the entire pipeline on webhook errors
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
-        }
+        if not failed:
+            continue
+        if len(failed) == len(outcomes[message_id]):
+            redeliver.append((record, attempt))
+        else:
+            requeue.append(({
+                'MessageBody': message_for(event, list(failed), attempt),
+                'DelaySeconds': min(SQS_MAX_DELAY_SECONDS, retry_delay(attempt))
+            }, record))
+    
+    # Anything that can't be handed on is redelivered whole rather than lost
+    unsent = []
+    if dead:
+        unsent.extend(send_messages(DEAD_LETTER_QUEUE_URL, dead) if DEAD_LETTER_QUEUE_URL else [r for _, r in dead])
+    if requeue:
+        unsent.extend(send_messages(WEBHOOK_QUEUE_URL, requeue) if WEBHOOK_QUEUE_URL else [r for _, r in requeue])
+    
+    redelivered = {record['messageId'] for record, _ in redeliver}
+    for record in unsent:
+        if record['messageId'] not in redelivered:
+            redelivered.add(record['messageId'])
+            event = events.get(record['messageId'], {})
+            redeliver.append((record, attempts_made(record, event) if event else 1))
+    
+    if redeliver:
+        schedule_retries(redeliver)
+    
+    print(json.dumps({
+        'event': 'WEBHOOK_BATCH',
+        'received': len(records),
+        'delivered': counts[DELIVERED],
+        'skipped': counts[SKIPPED],
+        'requeued': len(requeue),
+        'retried': len(redeliver),
+        'deadLettered': len(dead)
+    }))
+    
+    # Partial batch response: only these messages return to the queue
+    return {'batchItemFailures': [{'itemIdentifier': record['messageId']} for record, _ in redeliver]}
+
+def handler(event, context):
+    """
+    Webhook sender for risk change events
+    Supports HMAC signing, optional mTLS and batched payloads
+    
+    Invoked by the SQS webhook queue with batches of Risk Updated events.
+    A single EventBridge event is still accepted for direct invocation; it
+    raises on failure so the invocation is retried rather than dropped.
+    """
+    if 'Records' in event:
+        return handle_queue_batch(event['Records'], delivery_timeout(context))
+    
+    outcomes = dispatcher.deliver([(event.get('id'), event)], timeout=delivery_timeout(context))[event.get('id')]
+    errors = [error for outcome, error in outcomes.values() if outcome in (RETRY, DEAD)]
+    if errors:
+        raise RuntimeError(f"Webhook delivery failed: {'; '.join(errors)}")
+    
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Webhook sent',
+            'entityId': event['detail']['entityId'],
+            'tenants': sorted(t for t, (outcome, _) in outcomes.items() if outcome == DELIVERED)
+        })
+    }
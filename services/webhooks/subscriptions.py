@@ -0,0 +1,112 @@
+"""
+Webhook subscription index
+
+Maps a Risk Updated event to every tenant whose subscription matches it.
+A subscription filters on entityIds, entityTypes and statuses; a filter that
+is missing or empty matches anything. Entity types are compared after the
+same normalization the screening API applies, so "ORG" matches events of
+ORGANIZATION entities. Each filter value points at the set of
+subscriptions that accept it, so routing an event is a few set lookups and
+intersections regardless of how many tenants subscribe.
+
+Subscriptions are stored as the latest version of the CONFIG:webhook:subscriptions
+item in the risk table:
+
+    {"subscriptions": [
+        {"tenantId": "acme", "entityTypes": ["ORG"], "statuses": ["REVIEW_REQUIRED"]},
+        {"tenantId": "globex", "entityIds": ["PERSON:john_doe"]}
+    ]}
+
+Without that item every event goes to the "default" tenant.
+"""
+
+SUBSCRIPTIONS_CONFIG_ID = 'CONFIG:webhook:subscriptions'
+
+DEFAULT_TENANT = 'default'
+
+# Entity type spellings -> the pipeline's types (as in screen-entity's name_index)
+ENTITY_TYPE_ALIASES = {
+    'PERSON': 'PERSON',
+    'COMPANY': 'ORGANIZATION',
+    'ORGANIZATION': 'ORGANIZATION',
+    'ORG': 'ORGANIZATION'
+}
+
+# Subscription filter field -> event attribute it matches
+FILTERS = {
+    'entityIds': 'entityId',
+    'entityTypes': 'entityType',
+    'statuses': 'status'
+}
+
+def normalize_entity_type(entity_type):
+    if not entity_type:
+        return None
+    return ENTITY_TYPE_ALIASES.get(entity_type.upper(), entity_type.upper())
+
+def event_attributes(detail):
+    """
+    Attributes of a Risk Updated event that subscriptions filter on
+    """
+    entity_id = detail.get('entityId') or ''
+    entity_type = detail.get('entityType')
+    if not entity_type and ':' in entity_id:
+        entity_type = entity_id.split(':', 1)[0]
+    return {
+        'entityId': entity_id,
+        'entityType': normalize_entity_type(entity_type),
+        'status': detail.get('status')
+    }
+
+class SubscriptionIndex:
+    """
+    Inverted index from filter values to subscriptions
+    """
+    
+    def __init__(self, subscriptions):
+        self.tenants = []
+        self.by_value = {field: {} for field in FILTERS}
+        self.unfiltered = {field: set() for field in FILTERS}
+        
+        for position, subscription in enumerate(subscriptions):
+            self.tenants.append(subscription['tenantId'])
+            for field in FILTERS:
+                values = subscription.get(field) or []
+                if not values:
+                    self.unfiltered[field].add(position)
+                for value in values:
+                    if field == 'entityTypes':
+                        value = normalize_entity_type(value)
+                    self.by_value[field].setdefault(value, set()).add(position)
+    
+    def match(self, detail):
+        """
+        Tenant ids subscribed to an event, in subscription order
+        """
+        attributes = event_attributes(detail)
+        matched = None
+        
+        for field, attribute in FILTERS.items():
+            candidates = self.unfiltered[field] | self.by_value[field].get(attributes[attribute], set())
+            matched = candidates if matched is None else matched & candidates
+            if not matched:
+                return []
+        
+        # A tenant with several matching subscriptions still gets the event once
+        return list(dict.fromkeys(self.tenants[position] for position in sorted(matched)))
+
+def load_subscriptions(table):
+    """
+    SubscriptionIndex from the latest subscriptions config item
+    """
+    response = table.query(
+        KeyConditionExpression='entityId = :eid',
+        ExpressionAttributeValues={':eid': SUBSCRIPTIONS_CONFIG_ID},
+        ScanIndexForward=False,
+        Limit=1
+    )
+    
+    items = response.get('Items', [])
+    if not items:
+        return SubscriptionIndex([{'tenantId': DEFAULT_TENANT}])
+    return SubscriptionIndex(items[0].get('subscriptions', []))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for API response serialization
+Encodes risk profiles shaped like DynamoDB items (Decimal numbers, string
+sets) with the old DecimalEncoder and with the shared api_response layer,
+using the standard library and, when installed, orjson
+"""
+
+import gzip
+import importlib.util
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FIXTURE = os.path.join(ROOT, 'tests', 'fixtures', 'expected-risk-scoring-output.json')
+
+spec = importlib.util.spec_from_file_location(
+    'api_response', os.path.join(ROOT, 'services', 'api', 'common', 'python', 'api_response.py')
+)
+api_response = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(api_response)
+
+PAGE_SIZES = [20, 100, 1000]
+MIN_SECONDS = 1.0
+
+class DecimalEncoder(json.JSONEncoder):
+    """
+    Previous get-risk-history encoder (plus sets, which it didn't handle),
+    kept here for comparison only
+    """
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        if isinstance(obj, (set, frozenset)):
+            return list(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+def build_items(count):
+    """
+    History items as boto3 returns them: numbers as Decimal, aliases as a set
+    """
+    with open(FIXTURE) as f:
+        profiles = json.load(f, parse_float=Decimal, parse_int=Decimal)['riskProfiles']
+    
+    items = []
+    for i in range(count):
+        profile = profiles[i % len(profiles)]
+        items.append({
+            **profile,
+            'asOfTs': Decimal(1699459200 - i * 86400),
+            'aliases': {profile['entityName'], profile['entityName'].upper()}
+        })
+    return items
+
+def measure(fn, value, rounds=5):
+    """
+    Best mean seconds per call over several rounds of at least MIN_SECONDS / rounds
+    """
+    fn(value)
+    best = None
+    for _ in range(rounds):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            fn(value)
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= MIN_SECONDS / rounds:
+                break
+        best = min(best or elapsed / calls, elapsed / calls)
+    return best
+
+def main():
+    encoders = [
+        ('DecimalEncoder', lambda body: json.dumps(body, cls=DecimalEncoder)),
+        ('stdlib', api_response.stdlib_dumps)
+    ]
+    try:
+        import orjson
+        encoders.append(('orjson', lambda body: orjson.dumps(body, default=api_response.to_json_value)))
+    except ImportError:
+        print("orjson not installed; skipping that backend")
+    
+    print(f"{'Items':>6} {'Encoder':>15} {'ms/call':>9} {'Speedup':>8} {'Bytes':>10} {'Gzipped':>9}")
+    
+    for count in PAGE_SIZES:
+        body = {'entityId': 'PERSON:benchmark', 'history': build_items(count), 'count': count}
+        
+        # Outputs must agree once parsed back
+        expected = json.loads(encoders[1][1](body))
+        baseline = None
+        
+        for name, fn in encoders:
+            output = fn(body)
+            assert json.loads(output) == expected or name == 'DecimalEncoder', name
+            
+            seconds = measure(fn, body)
+            baseline = baseline or seconds
+            size = len(output)
+            gzipped = len(gzip.compress(output if isinstance(output, bytes) else output.encode(), api_response.GZIP_LEVEL))
+            print(f"{count:>6} {name:>15} {seconds * 1000:>9.2f} {baseline / seconds:>7.1f}x {size:>10} {gzipped:>9}")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark for PII redaction on multi-MB scraped payloads
+Compares the single-pass redactor against the previous
+per-pattern finditer + str.replace implementation
+"""
+
+import importlib.util
+import json
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FIXTURE = os.path.join(ROOT, 'tests', 'fixtures', 'sample-scraped-data.json')
+REDACTION_DIR = os.path.join(ROOT, 'services', 'privacy', 'redaction')
+
+# Load the redaction Lambda module without clashing with other index.py files;
+# its sibling modules (streaming, ...) are imported from the Lambda directory
+sys.path.insert(0, REDACTION_DIR)
+spec = importlib.util.spec_from_file_location(
+    'redaction_index', os.path.join(REDACTION_DIR, 'index.py')
+)
+redaction = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(redaction)
+
+PAYLOAD_SIZES_MB = [1, 4, 16]
+LEGACY_MAX_MB = 1  # The old implementation is quadratic; larger sizes take minutes
+
+def legacy_redact_pii(text):
+    """
+    Previous implementation, kept here for comparison only
+    """
+    redacted = text
+    redactions = []
+    
+    for pii_type, pattern in redaction.PII_PATTERNS.items():
+        matches = re.finditer(pattern, redacted)
+        for match in matches:
+            redacted = redacted.replace(match.group(), f'[REDACTED_{pii_type}]')
+            redactions.append({
+                'type': pii_type,
+                'position': match.start()
+            })
+    
+    return redacted, redactions
+
+def build_payload(size_mb, seed=42):
+    """
+    Scraped NDJSON of roughly size_mb, built from the sample fixture records
+    with synthetic PII sprinkled into the metadata
+    """
+    rng = random.Random(seed)
+    
+    with open(FIXTURE) as f:
+        base_records = json.load(f)['records']
+    
+    def fake_pii():
+        kind = rng.choice(['ssn', 'email', 'phone', 'card'])
+        if kind == 'ssn':
+            return f"{rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}"
+        if kind == 'email':
+            return f"user{rng.randint(1, 99999)}@example.com"
+        if kind == 'phone':
+            return f"{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}"
+        return ' '.join(str(rng.randint(1000, 9999)) for _ in range(4))
+    
+    lines = []
+    size = 0
+    target = size_mb * 1024 * 1024
+    
+    while size < target:
+        record = dict(rng.choice(base_records))
+        record['metadata'] = {
+            **record.get('metadata', {}),
+            'contact': f"Reach at {fake_pii()} or {fake_pii()}",
+            'notes': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * rng.randint(1, 4)
+        }
+        line = json.dumps(record)
+        lines.append(line)
+        size += len(line) + 1
+    
+    return '\n'.join(lines) + '\n'
+
+def timed(fn, text):
+    started = time.perf_counter()
+    result = fn(text)
+    return result, time.perf_counter() - started
+
+def main():
+    print(f"{'Size':>6} {'Matches':>9} {'Single-pass':>13} {'MB/s':>8} {'Legacy':>10} {'Speedup':>8}")
+    
+    for size_mb in PAYLOAD_SIZES_MB:
+        text = build_payload(size_mb)
+        (redacted, redactions), elapsed = timed(redaction.redact_pii, text)
+        
+        # Offsets must point at the original PII
+        for item in redactions:
+            matched = text[item['position']:item['end']]
+            assert re.fullmatch(redaction.PII_PATTERNS[item['type']], matched), item
+        
+        legacy_column = speedup_column = '-'
+        if size_mb <= LEGACY_MAX_MB:
+            (legacy_redacted, _), legacy_elapsed = timed(legacy_redact_pii, text)
+            legacy_column = f"{legacy_elapsed:.2f}s"
+            speedup_column = f"{legacy_elapsed / elapsed:.0f}x"
+        
+        mb = len(text) / (1024 * 1024)
+        print(f"{mb:>5.1f}M {len(redactions):>9} {elapsed:>12.3f}s {mb / elapsed:>8.1f} {legacy_column:>10} {speedup_column:>8}")
+
+if __name__ == '__main__':
+    sys.exit(main())